@@ -1,6 +1,7 @@
 """Tools for managing bot scripts.
 
 Modules:
+    convert_queue: Convert saved queue data between JSON and snapshots.
     script_tools: Tools used in utility scripts.
     package: Package the queuebot in a standalone file.
     update_version: Manage queuebot version number.
@@ -0,0 +1,18 @@
+"""Convert saved queue data between JSON and binary snapshot formats.
+
+Usage:
+    python -m scripts.convert_queue data/<channel>.json data/<channel>.qbs
+    python -m scripts.convert_queue data/<channel>.qbs data/<channel>.json
+"""
+
+import sys
+
+from queuebot.tools.snapshot import convert
+
+if __name__ == "__main__":
+    try:
+        _, src, dst = sys.argv
+    except ValueError:
+        print(__doc__)
+        sys.exit(1)
+    convert(src, dst)
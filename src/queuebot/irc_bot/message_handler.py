@@ -7,17 +7,32 @@ Classes:
 """
 
 import threading
+from collections import OrderedDict
 
 from ..tools.chat import CommandHandler
-from ..tools.highlight_string import Highlighter, find_strings
+from ..tools.highlight_string import Highlighter, StringMatcher
+from ..tools.pick_history import HISTORY_WINDOW
 from ..tools.song_queue import SongQueue
 from .events import HandleEvent
 
+# Number of messages whose emote positions and highlighting are cached
+EMOTE_CACHE_SIZE = 256
+
 
 class MessageHandler:
     """Handler to generate responses from messages."""
 
-    def __init__(self, channel, sep, trunc, logging, emotes):
+    def __init__(
+        self,
+        channel,
+        sep,
+        trunc,
+        logging,
+        emotes,
+        storage=None,
+        history_window=HISTORY_WINDOW,
+        catalog=None,
+    ):
         """Create a MessageHandler.
 
         Args:
@@ -26,20 +41,49 @@ class MessageHandler:
                 the following word shall be treated as a command.
             trunc: Function used to truncate long messages.
             logging: Whether to log all received messages to file.
-            emotes: List of lists of strings that shall be treated as emotes,
+            emotes: Dict of lists of strings that shall be treated as emotes,
                 in addition to the emote designations listed in the message
                 for native twitch emotes.
+            storage: Storage backend used to save the queue, as returned by
+                get_storage. Defaults to a JSON file.
+            history_window: Number of recent picks the queue keeps in memory.
+            catalog: Catalog of songs that random mode requests must match,
+                or None to accept any request.
         """
         self.sep = sep
         self.channel = channel
-        self.emotes = [emote for emote_list in emotes.values() for emote in emote_list]
+        self.emotes = []
+        self.emote_matcher = StringMatcher()
+        self.emote_version = 0
+        self.emote_cache = OrderedDict()
+        self.emote_cache_hits = 0
+        self.emote_cache_misses = 0
+        self.set_emotes(emotes)
         self.emote_indices_short = []
         self.command_handler = CommandHandler()
-        self.song_queue = SongQueue(self.channel)
+        self.song_queue = SongQueue(
+            self.channel, storage=storage, history_window=history_window, catalog=catalog
+        )
         self.lock = threading.Lock()
         self.logging = bool(logging == "True")
         self.trunc = trunc
 
+    def set_emotes(self, emotes):
+        """Replace the strings treated as emotes.
+
+        The new matcher is built before being swapped in, so messages being
+        handled meanwhile are searched with either the old emotes or the new
+        ones, never a mix. Bumping the version stops results cached for the
+        old emotes from being used.
+
+        Args:
+            emotes: Dict of lists of strings that shall be treated as emotes.
+        """
+        emote_list = [emote for emote_list in emotes.values() for emote in emote_list]
+        self.emote_matcher = StringMatcher(emote_list)
+        self.emotes = emote_list
+        self.emote_version += 1
+
     def handle_msg(self, chat_msg, msg_type="pubmsg"):
         """Handle a given message.
 
@@ -100,7 +144,9 @@ class MessageHandler:
     def handle_emotes(self, msg: dict):
         """Check a message to see if it contains any emote strings.
 
-        If found, colourise the message around each emote.
+        If found, colourise the message around each emote. Results are kept
+        for the most recent messages, so repeats of a message, as in a flood
+        of copypasta, skip searching and highlighting it again.
 
         Args:
             msg (irc.client.Event):
@@ -109,19 +155,48 @@ class MessageHandler:
         Returns:
             String containing any applicable colour codes around emote strings.
         """
+        try:
+            tag = msg["tags"]["emotes"]
+        except KeyError:
+            tag = None
+        key = (msg["msg"], tag, self.emote_version)
+        cached = self.emote_cache.get(key)
+        if cached is None:
+            self.emote_cache_misses += 1
+            cached = self._find_emotes(msg["msg"], tag)
+            self.emote_cache[key] = cached
+            if len(self.emote_cache) > EMOTE_CACHE_SIZE:
+                self.emote_cache.popitem(last=False)
+        else:
+            self.emote_cache_hits += 1
+            self.emote_cache.move_to_end(key)
+        emote_indices, highlighted = cached
+
+        adjustment = len(msg["words"][0]) + 1
+        self.emote_indices_short = [(i - adjustment, j - adjustment) for (i, j) in emote_indices]
+        return highlighted
+
+    def _find_emotes(self, text, tag):
+        """Find the emotes in a message and highlight them.
+
+        Args:
+            text: Message text.
+            tag: Value of the message's emotes tag, listing the positions of
+                native twitch emotes, or None if it had none.
+
+        Returns:
+            2-tuple of the list of emote positions, and the message text with
+            colour codes around each emote.
+        """
         try:
             twitch_indices = [
                 (int(p.split("-")[0]), int(p.split("-")[1]) + 1)
-                for t in msg["tags"]["emotes"].split("/")
+                for t in tag.split("/")
                 for p in t.split(":")[1].split(",")
             ]
-        except (AttributeError, IndexError, KeyError):
+        except (AttributeError, IndexError):
             twitch_indices = []
 
-        bttv_indices = find_strings(msg["msg"], self.emotes)
+        bttv_indices = self.emote_matcher.find(text)
         emote_indices = list(set(bttv_indices + twitch_indices))
-
-        adjustment = len(msg["words"][0]) + 1
-        self.emote_indices_short = [(i - adjustment, j - adjustment) for (i, j) in emote_indices]
-
-        return Highlighter(True, msg["msg"], indices=emote_indices).get_highlight()
+        return emote_indices, Highlighter(True, text, indices=emote_indices).get_highlight()
@@ -12,9 +12,11 @@ from readchar import readchar
 from queuebot.irc_bot.background_bot import BackgroundBot
 from queuebot.irc_bot.irc_bot import IrcBot
 from queuebot.irc_bot.message_handler import MessageHandler
+from queuebot.tools.catalog import load_catalog
 from queuebot.tools.config import BadOAuth, Configuration, check_update
 from queuebot.tools.get_emotes import get_emotes
 from queuebot.tools.song_queue import trunc
+from queuebot.tools.storage import get_storage
 from queuebot.tools.text import colourise as col
 from queuebot.tools.twitch_auth import AuthorisedContext
 
@@ -59,7 +61,7 @@ def close(*_args):
     try:
         bg_bot.quit()
         bg_bot.thread.join()
-        message_handler.song_queue.save()
+        message_handler.song_queue.close()
     except Exception:
         print(col("Bot was not running", "GREY"))
     print(col("Cleanup complete", "GREY"))
@@ -99,7 +101,14 @@ def setup_bot(*args):
     emotes = get_emotes(channel)
     global message_handler
     message_handler = MessageHandler(
-        channel, config["bot_prefix"], trunc, config["logging"], emotes
+        channel,
+        config["bot_prefix"],
+        trunc,
+        config["logging"],
+        emotes,
+        storage=get_storage(channel, config["storage"], float(config["save_interval"])),
+        history_window=int(config["history_window"]),
+        catalog=load_catalog(config["catalog"]),
     )
     irc_bot = IrcBot(
         bot_name,
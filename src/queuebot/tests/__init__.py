@@ -1,5 +1,6 @@
 """Packages and modules for testing the queuebot.
 
 Packages:
+    irc_bot: Test the IRC chatbot modules used in the queuebot.
     tools: Test the tool modules used in the queuebot.
 """
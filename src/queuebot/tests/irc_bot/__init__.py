@@ -0,0 +1,6 @@
+"""Modules for testing the IRC chatbot used in the queuebot.
+
+Modules:
+    test_message_handler: Test the MessageHandler, verifying that emote
+        results are cached for repeated messages until the emotes change.
+"""
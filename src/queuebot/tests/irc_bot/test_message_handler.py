@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from queuebot.irc_bot.message_handler import EMOTE_CACHE_SIZE, MessageHandler
+from queuebot.tools.storage import JsonStorage
+
+EMOTES = {"bttv": ["Kappa", "PogChamp"]}
+
+
+def message(text):
+    """Return a message dict as built by handle_msg for the given text."""
+    return {"msg": text, "tags": {}, "words": text.split()}
+
+
+# ruff: noqa: D101, D102
+class TestEmoteCache(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        storage = JsonStorage(os.path.join(self.tempdir.name, "channel.json"))
+        with patch("builtins.print"):
+            self.handler = MessageHandler("channel", "!", str, "False", EMOTES, storage)
+        self.find = patch.object(self.handler, "_find_emotes", wraps=self.handler._find_emotes)
+        self.find = self.find.start()
+        self.addCleanup(patch.stopall)
+
+    def tearDown(self):
+        self.handler.song_queue.close()
+        self.tempdir.cleanup()
+
+    def test_repeats(self):
+        first = self.handler.handle_emotes(message("hi Kappa Kappa"))
+        self.assertEqual(self.handler.handle_emotes(message("hi Kappa Kappa")), first)
+        self.assertEqual(self.handler.emote_indices_short, [(0, 5), (6, 11)])
+        self.assertEqual(self.find.call_count, 1)
+        self.assertEqual((self.handler.emote_cache_hits, self.handler.emote_cache_misses), (1, 1))
+
+    def test_eviction(self):
+        for index in range(EMOTE_CACHE_SIZE):
+            self.handler.handle_emotes(message(f"msg{index} Kappa"))
+        self.handler.handle_emotes(message("msg0 Kappa"))
+        self.handler.handle_emotes(message("new Kappa"))
+        self.assertEqual(len(self.handler.emote_cache), EMOTE_CACHE_SIZE)
+        self.find.reset_mock()
+        self.handler.handle_emotes(message("msg0 Kappa"))
+        self.find.assert_not_called()
+        self.handler.handle_emotes(message("msg1 Kappa"))
+        self.find.assert_called_once()
+
+    def test_new_emotes(self):
+        before = self.handler.handle_emotes(message("hi PogChamp"))
+        self.handler.set_emotes({"bttv": ["Kappa"]})
+        after = self.handler.handle_emotes(message("hi PogChamp"))
+        self.assertNotEqual(after, before)
+        self.assertEqual(after, "hi PogChamp")
+        self.assertEqual(self.handler.emote_indices_short, [])
+        self.assertEqual(self.find.call_count, 2)
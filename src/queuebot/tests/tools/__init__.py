@@ -1,10 +1,28 @@
 """Modules for testing the tools used in the queuebot.
 
 Modules:
+    test_catalog: Test the song Catalog, verifying that requests are matched
+        to titles and that its index is cached.
+    test_pick_history: Test the PickHistory, verifying that older picks are
+        archived to disk and still listed once the queue is reloaded.
+    test_search_index: Test the TrigramIndex, FuzzyIndex and PrefixTrie,
+        verifying that searches find every match as texts are added and
+        removed.
+    test_snapshot: Test the binary snapshot format, verifying that data
+        survives a round trip and conversion to and from JSON.
+    test_song_queue: Test the SongQueue's commands, verifying that list pages
+        are cached until the queue changes, lookups are bounded and every
+        change can be undone and redone.
+    test_storage: Test the storage backends, verifying that journalled changes
+        are replayed and compacted, and that unchanged queues aren't saved.
+    test_tiered_list: Test the TieredList and PooledList, verifying that tiers
+        keep their order and pools pick from the lowest tier.
     test_timed_list: Test the timed list, verifying that it correctly wipes its
         data.
     test_tuple_list: Test the TupleList, verifying that it holds and presents
         the expected data.
     test_text.py: Test the Paginate class and other functions in the text
         module.
+    test_undo_history: Test the UndoHistory, verifying that steps are handed
+        back in the right order and within the limit.
 """
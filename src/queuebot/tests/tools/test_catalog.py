@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from queuebot.tools.catalog import Catalog, load_catalog
+from queuebot.tools.song_queue import SongQueue
+from queuebot.tools.storage import JsonStorage
+
+TITLES = [
+    "# Just Dance catalog",
+    "Toxic - Britney Spears",
+    "Don't Stop Me Now - Queen",
+    "",
+    "Dancing Queen - ABBA",
+    "Dancing in the Dark - Bruce Springsteen",
+    "Halo - Beyoncé",
+]
+
+
+# ruff: noqa: D101, D102
+class TestCatalog(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, "catalog.txt")
+        with open(self.path, "w", encoding="utf-8") as file_:
+            file_.write("\n".join(TITLES))
+        self.catalog = Catalog(self.path)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_match(self):
+        self.assertEqual(len(self.catalog), 5)
+        self.assertIn("halo beyonce", self.catalog)
+        self.assertEqual(self.catalog.match("DONT STOP me now, queen"), (TITLES[2], []))
+        self.assertEqual(self.catalog.match("toxic"), (TITLES[1], []))
+        self.assertEqual(self.catalog.match("Tocix - Britney Spears"), (TITLES[1], []))
+        self.assertEqual(self.catalog.match("dancing"), (None, TITLES[4:6]))
+        self.assertEqual(self.catalog.match("Dancing Queen ABA")[0], TITLES[4])
+        self.assertEqual(self.catalog.match("nothing like it"), (None, []))
+        self.assertEqual(self.catalog.match("!!"), (None, []))
+
+    def test_cache(self):
+        self.assertTrue(os.path.exists(self.catalog.cache_path))
+        with patch.object(Catalog, "_build") as build:
+            cached = Catalog(self.path)
+            build.assert_not_called()
+        self.assertEqual(cached.match("tocix"), self.catalog.match("tocix"))
+
+        with open(self.path, "a", encoding="utf-8") as file_:
+            file_.write("\nPoker Face - Lady Gaga")
+        self.assertEqual(Catalog(self.path).match("poker face")[0], "Poker Face - Lady Gaga")
+
+    def test_load_catalog(self):
+        self.assertIsNone(load_catalog(""))
+        with patch("builtins.print"):
+            self.assertIsNone(load_catalog(os.path.join(self.tempdir.name, "missing.txt")))
+        self.assertEqual(len(load_catalog(self.path)), 5)
+
+    def test_requests(self):
+        storage = JsonStorage(os.path.join(self.tempdir.name, "channel.json"))
+        with patch("builtins.print"):
+            queue = SongQueue("channel", storage=storage, catalog=self.catalog)
+        self.assertIn(TITLES[1], queue.mthds.addentry("user1", "toxic", []))
+        self.assertIn("did you mean", queue.mthds.addentry("user2", "dancing", []))
+        self.assertNotIn("user2", queue)
+        self.assertEqual(queue.entries.serialise(), [("user1", TITLES[1])])
+        queue.close()
@@ -84,16 +84,6 @@ class TestHighlightFunctions(unittest.TestCase):
             "\x1b[36;1maa\x1b[0md a\x1b[36;1mbb\x1b[0ma",
         )
 
-    def test_calc_indices(self):
-        self.assertEqual(
-            highlight_string._calc_indices("aa bb baab daa aad abba", "aa"),
-            [(0, 2), (7, 9), (12, 14), (15, 17)],
-        )
-        self.assertEqual(highlight_string._calc_indices("", "aa"), [])
-        self.assertRaises(
-            ValueError, highlight_string._calc_indices, "aa bb baab daa aad abba", ""
-        )
-
     def test_is_emote(self):
         test_string = "This is a test string"
         res = [
@@ -120,3 +110,23 @@ class TestHighlightFunctions(unittest.TestCase):
             ),
             [(0, 2), (3, 5), (7, 9), (11, 13), (15, 17), (18, 20), (21, 23), (26, 28)],
         )
+
+    def test_string_matcher(self):
+        matcher = highlight_string.StringMatcher(["aa", "ab", "b a", ""])
+        test_string = "aaa bab abab aa"
+        self.assertEqual(
+            matcher.find(test_string),
+            [(0, 2), (5, 7), (6, 9), (8, 10), (10, 12), (11, 14), (13, 15)],
+        )
+        self.assertEqual(matcher.find(test_string, emote=True), [(13, 15)])
+        self.assertEqual(matcher.find(""), [])
+        self.assertFalse(highlight_string.StringMatcher([""]))
+        self.assertEqual(highlight_string.StringMatcher().find(test_string), [])
+
+    def test_highlight_overlaps(self):
+        res = highlight_string._highlight("aa bb baab", [(6, 9), (3, 5), (0, 2), (3, 5), (7, 10)])
+        self.assertEqual(
+            res,
+            "\x1b[36;1maa\x1b[0m \x1b[36;1mbb\x1b[0m \x1b[36;1mbaab\x1b[0m",
+        )
+        self.assertEqual(highlight_string._highlight("aa", [(1, 1)]), "aa")
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+
+from queuebot.tools.pick_history import PickArchive, PickHistory, remove_stale_archives
+from queuebot.tools.song_queue import SongQueue
+from queuebot.tools.storage import JournalStorage, JsonStorage, SqliteStorage
+
+PICKS = [(f"user{i % 7}", f"song{i}") for i in range(30)]
+
+
+# ruff: noqa: D101, D102
+class TestPickHistory(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.prefix = os.path.join(self.tempdir.name, "channel.picks.abc")
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def history(self):
+        history = PickHistory(PickArchive(self.prefix, segment_size=4), window=3)
+        for pick in PICKS:
+            history.append(pick)
+            if history.full():
+                history.rotate()
+        return history
+
+    def test_rotate(self):
+        history = self.history()
+        self.assertEqual(len(history), len(PICKS))
+        self.assertLessEqual(len(history.serialise()), 6)
+        self.assertEqual(len(history.archive) + len(history.serialise()), len(PICKS))
+        self.assertEqual(list(history.newest()), PICKS[::-1])
+
+    def test_reopen(self):
+        history = self.history()
+        archive = PickArchive(self.prefix, segment_size=4)
+        self.assertEqual(len(archive), len(history.archive))
+        self.assertEqual(list(archive.newest(5)), PICKS[4::-1])
+
+    def test_pop(self):
+        history = self.history()
+        self.assertEqual(history.pop(), PICKS[-1])
+        self.assertEqual(list(history.newest()), PICKS[-2::-1])
+        self.assertEqual(len(history), len(PICKS) - 1)
+
+    def test_remove_stale(self):
+        self.history()
+        stale = os.path.join(self.tempdir.name, "channel.picks.old.0.jsonl")
+        open(stale, "w").close()
+        remove_stale_archives(self.tempdir.name, "channel", "abc")
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.exists(self.prefix + ".0.jsonl"))
+
+
+class TestQueueHistory(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def run_picks(self, storage_type, name):
+        def queue():
+            path = os.path.join(self.tempdir.name, name)
+            storage = (
+                storage_type(path, "channel")
+                if storage_type is SqliteStorage
+                else storage_type(path)
+            )
+            return SongQueue("channel", storage=storage, history_window=4)
+
+        first = queue()
+        for user, song in PICKS:
+            first.mthds.addentry(user, song, [])
+            first.mthds.pickentry("")
+            first.save()
+        first.mthds.undo()
+        first.close()
+        self.assertLessEqual(len(first.picked.serialise()), 8)
+
+        loaded = queue()
+        self.assertEqual(list(loaded.picked.newest()), PICKS[-2::-1])
+        self.assertEqual(loaded.pick_counts, first.pick_counts)
+        self.assertEqual(loaded.times_picked("USER0"), 5)
+        self.assertTrue(
+            loaded.mthds.picked("").startswith('Songs already played: "song28", "song27"')
+        )
+        self.assertTrue(loaded.mthds.picked("").endswith('"song1", "song0"'))
+        loaded.mthds.clear()
+        self.assertEqual(loaded.mthds.picked(""), "Nothing's been played yet")
+        loaded.close()
+
+    def test_json(self):
+        self.run_picks(JsonStorage, "channel.json")
+
+    def test_journal(self):
+        self.run_picks(JournalStorage, "channel.json")
+
+    def test_sqlite(self):
+        self.run_picks(SqliteStorage, "queuebot.db")
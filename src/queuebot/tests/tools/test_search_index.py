@@ -0,0 +1,90 @@
+import unittest
+
+from queuebot.tools.search_index import FuzzyIndex, PrefixTrie, TrigramIndex, normalise
+
+
+# ruff: noqa: D101, D102
+class TestTrigramIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = TrigramIndex()
+        self.index.add("a", "Toxic")
+        self.index.add("b", "Toxicity")
+        self.index.add("c", "Hello World")
+
+    def test_search(self):
+        self.assertEqual(self.index.search("TOX"), {"a", "b"})
+        self.assertEqual(self.index.search("city"), {"b"})
+        self.assertEqual(self.index.search("o"), {"a", "b", "c"})
+        self.assertEqual(self.index.search("o w"), {"c"})
+        self.assertEqual(self.index.search("toxic world"), set())
+        self.assertEqual(self.index.search("xyz"), set())
+
+    def test_update(self):
+        self.index.add("a", "Hello")
+        self.assertEqual(self.index.search("toxic"), {"b"})
+        self.assertEqual(self.index.search("hello"), {"a", "c"})
+        self.index.discard("c")
+        self.index.discard("missing")
+        self.assertEqual(self.index.search("hello"), {"a"})
+        self.assertEqual(len(self.index), 2)
+
+
+class TestFuzzyIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = FuzzyIndex()
+        self.index.add("a", "Toxic - Britney Spears")
+        self.index.add("b", "Don't Stop Me Now")
+        self.index.add("c", "Halo")
+
+    def test_normalise(self):
+        self.assertEqual(normalise("  Don\u2019t STOP me—now!! "), "dont stop me now")
+        self.assertEqual(normalise("Beyoncé ﬁre"), "beyonce fire")
+
+    def test_similar(self):
+        self.assertEqual(self.index.similar("DONT stop me now!", 0.8), {"b": 1.0})
+        self.assertEqual(set(self.index.similar("britney spears, toxic", 0.8)), {"a"})
+        self.assertEqual(self.index.similar("toxic", 0.8), {})
+        self.assertEqual(set(self.index.similar("toxik", 0.5, partial=True)), {"a"})
+        self.assertEqual(self.index.similar("!!!", 0), {})
+
+    def test_threshold(self):
+        self.assertEqual(self.index.similar("hal", 4 / 7), {"c": 4 / 7})
+        self.assertEqual(self.index.similar("hal", 0.6), {})
+        self.assertEqual(self.index.similar("hal", 2 / 3, partial=True), {"c": 2 / 3})
+        for i in range(50):
+            self.index.add(i, f"the song {i}")
+        self.assertEqual(set(self.index.similar("the song 7", 0.9)), {7})
+        self.assertEqual(len(self.index.similar("the song", 0.5)), 50)
+        self.assertEqual(len(self.index.similar("the song 1", 0.9, partial=True)), 11)
+
+    def test_update(self):
+        self.index.add("c", "Dont stop me now")
+        self.assertEqual(set(self.index.similar("don't stop me now", 0.8)), {"b", "c"})
+        self.index.discard("b")
+        self.assertEqual(set(self.index.similar("don't stop me now", 0.8)), {"c"})
+        self.assertEqual(len(self.index), 2)
+
+
+class TestPrefixTrie(unittest.TestCase):
+    def setUp(self):
+        self.trie = PrefixTrie(["bob", "bobby", "alice", "al"])
+
+    def test_with_prefix(self):
+        self.assertEqual(sorted(self.trie.with_prefix("bo")), ["bob", "bobby"])
+        self.assertEqual(sorted(self.trie.with_prefix("al")), ["al", "alice"])
+        self.assertEqual(list(self.trie.with_prefix("bobbyx")), [])
+        self.assertEqual(len(list(self.trie.with_prefix(""))), 4)
+
+    def test_discard(self):
+        self.trie.add("bob")
+        self.trie.discard("bobby")
+        self.trie.discard("bobb")
+        self.trie.discard("al")
+        self.assertEqual(list(self.trie.with_prefix("b")), ["bob"])
+        self.assertEqual(list(self.trie.with_prefix("al")), ["alice"])
+        self.assertNotIn("al", self.trie)
+        self.assertIn("alice", self.trie)
+        self.assertEqual(len(self.trie), 2)
+        self.trie.discard("bob")
+        self.trie.discard("alice")
+        self.assertEqual(self.trie._root, {})
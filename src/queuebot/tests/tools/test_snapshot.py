@@ -0,0 +1,60 @@
+import json
+import os
+import tempfile
+import unittest
+
+from queuebot.tools import snapshot
+
+DATA = {
+    "channel": "channel",
+    "isopen": True,
+    "current": {"user": "user1", "entry": "song1"},
+    "mode": "random",
+    "currentusers": {"data": ["user1"], "delay": 600, "time": 1700000000.25},
+    "entries": [["user2", "song2"], ["User3", "sóng 3 ✨"]],
+    "picked": [["user1", "song1"], ["user1", "song1"]],
+    "generation": -2,
+}
+
+
+# ruff: noqa: D101, D102
+class TestSnapshot(unittest.TestCase):
+    def test_round_trip(self):
+        for compress in (True, False):
+            res = snapshot.loads(snapshot.dumps(DATA, compress))
+            self.assertEqual(json.loads(json.dumps(res)), DATA)
+            self.assertEqual(res["entries"], [("user2", "song2"), ("User3", "sóng 3 ✨")])
+
+    def test_mixed_values(self):
+        data = [[1, "a"], [], [None, False, True], -(2**40), 0.5, {"key": [["a", "b"]]}]
+        res = snapshot.loads(snapshot.dumps(data))
+        self.assertEqual(
+            res, [[1, "a"], [], [None, False, True], -(2**40), 0.5, {"key": [("a", "b")]}]
+        )
+
+    def test_smaller(self):
+        data = dict(DATA, picked=[[f"user{i % 50}", f"song{i % 300}"] for i in range(5000)])
+        encoded = snapshot.dumps(data, compress=False)
+        self.assertLess(len(encoded), len(json.dumps(data, indent=4)) // 4)
+        self.assertLess(len(snapshot.dumps(data)), len(encoded))
+
+    def test_bad_snapshot(self):
+        encoded = snapshot.dumps(DATA, compress=False)
+        self.assertRaises(ValueError, snapshot.loads, b"{}")
+        self.assertRaises(ValueError, snapshot.loads, encoded[:-3])
+        self.assertRaises(ValueError, snapshot.loads, b"QBS\x02\x00")
+        self.assertRaises(ValueError, snapshot.loads, snapshot.dumps(DATA)[:-3])
+        self.assertRaises(TypeError, snapshot.dumps, {1: "a"})
+        self.assertRaises(TypeError, snapshot.dumps, {"a": object()})
+
+    def test_convert(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            json_path = os.path.join(tempdir, "channel.json")
+            binary_path = os.path.join(tempdir, "channel.qbs")
+            with open(json_path, "w", encoding="utf-8") as file_:
+                json.dump(DATA, file_)
+            snapshot.convert(json_path, binary_path)
+            os.remove(json_path)
+            snapshot.convert(binary_path, json_path)
+            with open(json_path, encoding="utf-8") as file_:
+                self.assertEqual(json.load(file_), DATA)
@@ -0,0 +1,212 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from queuebot.tools.song_queue import MAX_LISTED_MATCHES, SongQueue
+from queuebot.tools.storage import JournalStorage, JsonStorage
+
+DATA = [(f"user{index}", f"song{index}") for index in range(100)]
+
+
+# ruff: noqa: D101, D102
+class TestListings(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        storage = JsonStorage(os.path.join(self.tempdir.name, "channel.json"))
+        with patch("builtins.print"):
+            self.queue = SongQueue("channel", *DATA, storage=storage)
+
+    def tearDown(self):
+        self.queue.close()
+        self.tempdir.cleanup()
+
+    def test_cached_pages(self):
+        first = self.queue.mthds.listentries("", 2)
+        self.assertTrue(first.startswith('28. "song27"'))
+        with patch.object(self.queue.mthds, "_render_entries") as render:
+            self.assertEqual(self.queue.mthds.listentries("", 2), first)
+            self.queue.mthds.listentries("", 3)
+            render.assert_not_called()
+        self.assertTrue(self.queue.mthds.listusers("", 1).startswith("List of users"))
+
+    def test_invalidation(self):
+        before = self.queue.mthds.listentries("", 1)
+        self.queue.mthds.removeentry("", 1)
+        after = self.queue.mthds.listentries("", 1)
+        self.assertNotEqual(after, before)
+        self.assertTrue(after.startswith('List of songs in the queue: 1. "song1"'))
+        self.queue.mthds.undo()
+        self.assertEqual(self.queue.mthds.listentries("", 1), before)
+
+    def test_picked(self):
+        self.queue.mthds.pickentry("", 1)
+        self.assertEqual(self.queue.mthds.picked("", 1), 'Songs already played: "song0"')
+        self.queue.mthds.pickentry("", 1)
+        self.assertEqual(self.queue.mthds.picked("", 1), 'Songs already played: "song1", "song0"')
+        self.queue.mthds.jbqueue()
+        self.assertEqual(self.queue.mthds.picked("", 1), "Users already picked: user1, user0")
+        users = self.queue.mthds.listentries("", 1)
+        self.assertTrue(users.startswith("List of users in the queue: 1. user2 • "))
+        self.assertTrue(users.endswith("(page 1/4)"))
+
+
+class TestLookups(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        storage = JsonStorage(os.path.join(self.tempdir.name, "channel.json"))
+        with patch("builtins.print"):
+            self.queue = SongQueue("channel", *DATA, storage=storage)
+
+    def tearDown(self):
+        self.queue.close()
+        self.tempdir.cleanup()
+
+    def test_lookupentry(self):
+        self.assertEqual(
+            self.queue.mthds.lookupentry("", "song42"), 'user42 requested "song42" at position 43'
+        )
+        for search in ("", "  "):
+            self.assertEqual(self.queue.mthds.lookupentry("", search), "Please specify a song")
+        self.queue.set_entry("user100", "Oh")
+        self.assertEqual(
+            self.queue.mthds.lookupentry("", "oh"), 'user100 requested "Oh" at position 101'
+        )
+
+    def test_lookupuser(self):
+        self.assertEqual(
+            self.queue.mthds.lookupuser("", "@User42"),
+            'user42\'s song is "song42", at position 43"',
+        )
+        self.assertEqual(
+            self.queue.mthds.lookupuser("", "r42"), self.queue.mthds.lookupuser("", "user42")
+        )
+        self.assertEqual(self.queue.mthds.lookupuser("", "@"), "Please specify a username")
+        self.assertEqual(self.queue.mthds.lookupuser("", "ed"), '"ed" is not in the queue')
+        self.queue.set_entry("Zed", "song100")
+        self.assertEqual(
+            self.queue.mthds.lookupuser("", "ed"), 'Zed\'s song is "song100", at position 101"'
+        )
+
+    def test_duplicates(self):
+        self.queue.mthds.addentry("user100", "Song number 1", [])
+        self.assertEqual(
+            self.queue.mthds.addentry("user101", "Song number 0", []),
+            'Added "Song number 0" to the queue for user101',
+        )
+        self.assertEqual(
+            self.queue.mthds.addentry("user102", "number 1, SONG!", []),
+            'Added "number 1, SONG!" to the queue for user102 • user100 already requested '
+            '"Song number 1" at position 101',
+        )
+
+    def test_listed_matches(self):
+        with patch("queuebot.tools.song_queue.page_of") as page_of:
+            self.queue.mthds.lookupentry("", "song")
+            self.queue.mthds.lookupuser("", "u")
+        for call in page_of.call_args_list:
+            self.assertEqual(len(list(call.args[0])), MAX_LISTED_MATCHES)
+
+
+class TestUndo(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, "channel.json")
+        with patch("builtins.print"):
+            self.queue = SongQueue("channel", *DATA[:5], storage=JournalStorage(self.path))
+
+    def tearDown(self):
+        self.queue.close()
+        self.tempdir.cleanup()
+
+    def state(self):
+        res = self.queue.serialise()
+        res["currentusers"] = res["currentusers"]["data"]
+        return res
+
+    def assertUndoes(self, command, *args):
+        before = self.state()
+        getattr(self.queue.mthds, command)(*args)
+        after = self.state()
+        self.assertNotEqual(after, before)
+        self.assertEqual(self.queue.mthds.undo(), "Last queue change has been undone")
+        self.assertEqual(self.state(), before)
+        self.assertEqual(self.queue.mthds.redo(), "Last undone queue change has been redone")
+        self.assertEqual(self.state(), after)
+        self.queue.mthds.undo()
+
+    def test_random_mode(self):
+        self.assertUndoes("addentry", "user9", "song9", [])
+        self.assertUndoes("addentry", "USER2", "changed", [])
+        self.assertUndoes("removeuser", "", "user2")
+        self.assertUndoes("removeentry", "", 4)
+        self.assertUndoes("pickentry", "", 3)
+        self.assertUndoes("pickentry", "")
+        self.assertUndoes("clear")
+        self.assertUndoes("close")
+        self.assertUndoes("jbqueue")
+
+    def test_priority_mode(self):
+        self.queue.mthds.jbqueue()
+        self.queue.mthds.pickentry("")
+        self.assertUndoes("addentry", "user0")
+        self.assertUndoes("pickentry", "")
+        self.assertUndoes("pickentry", "", 2)
+        self.assertUndoes("clearparty")
+        self.assertUndoes("jdqueue")
+
+    def test_steps(self):
+        before = self.state()
+        self.queue.mthds.pickentry("", 2)
+        self.queue.mthds.status("user0")
+        self.queue.mthds.leave("user3")
+        self.queue.mthds.leave("nobody")
+        self.queue.mthds.undo()
+        self.queue.mthds.undo()
+        self.assertEqual(self.state(), before)
+        self.assertEqual(self.queue.mthds.undo(), "Nothing to undo")
+        self.queue.mthds.redo()
+        self.queue.mthds.addentry("user9", "song9", [])
+        self.assertEqual(self.queue.mthds.redo(), "Nothing to redo")
+
+    def test_version(self):
+        version = self.queue.version
+        self.queue.mthds.listentries("")
+        self.queue.mthds.removeentry("", 99)
+        self.assertEqual(self.queue.version, version)
+        self.queue.set_entry("user9", "song9")
+        self.assertEqual(self.queue.version, version + 1)
+        self.queue.mthds.undo()
+        self.assertEqual(self.queue.version, version + 1)
+        self.queue.mthds.leave("user9")
+        self.queue.mthds.undo()
+        self.assertEqual(self.queue.version, version + 3)
+
+    def test_history_window(self):
+        path = os.path.join(self.tempdir.name, "window.json")
+        with patch("builtins.print"):
+            queue = SongQueue("window", *DATA[:10], storage=JournalStorage(path), history_window=2)
+        for _ in range(5):
+            queue.mthds.pickentry("", 1)
+        self.assertEqual(queue.picked.serialise(), [("user3", "song3"), ("user4", "song4")])
+        self.assertEqual(queue.mthds.undo(), "Last queue change has been undone")
+        self.assertEqual(queue.mthds.undo(), "Last queue change has been undone")
+        self.assertEqual(len(queue.history), 0)
+        self.assertEqual(queue.mthds.undo(), "Nothing to undo")
+        self.assertEqual(queue.picked.serialise(), [])
+        self.assertEqual(len(queue.picked), 3)
+        self.assertEqual(queue.mthds.redo(), "Last undone queue change has been redone")
+        self.assertEqual(queue.current["user"], "user3")
+        queue.close()
+
+    def test_reload(self):
+        self.queue.mthds.pickentry("", 2)
+        self.queue.mthds.removeentry("", 1)
+        self.queue.mthds.undo()
+        self.queue.mthds.undo()
+        self.queue.mthds.redo()
+        self.queue.close()
+        with patch("builtins.print"):
+            loaded = SongQueue("channel", storage=JournalStorage(self.path))
+        self.assertEqual(loaded.serialise(), self.queue.serialise())
+        loaded.storage.close()
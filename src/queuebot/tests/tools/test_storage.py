@@ -0,0 +1,243 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from queuebot.tools.song_queue import SongQueue
+from queuebot.tools.storage import (
+    BackgroundWriter,
+    JournalStorage,
+    JsonStorage,
+    SnapshotStorage,
+    SqliteStorage,
+    get_storage,
+)
+
+DATA = [("user1", "song1"), ("User2", "song2"), ("user3", "song3")]
+
+
+# ruff: noqa: D101, D102
+class TestJournalStorage(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, "channel.json")
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def queue(self, threshold=1024):
+        return SongQueue("channel", *DATA, storage=JournalStorage(self.path, threshold))
+
+    def journals(self):
+        return sorted(name for name in os.listdir(self.tempdir.name) if name.endswith(".journal"))
+
+    def test_replay(self):
+        queue = self.queue()
+        queue.storage.close()
+        queue.mthds.addentry("user4", "song4", [])
+        queue.mthds.removeuser("", "user2")
+        queue.mthds.pickentry("", 1)
+        queue.mthds.close()
+        queue.save()
+        queue.storage.close()
+        self.assertEqual(self.journals(), ["channel.1.journal"])
+
+        loaded = self.queue()
+        self.assertEqual(loaded.serialise(), queue.serialise())
+        self.assertEqual(loaded.times_picked("USER1"), 1)
+        loaded.storage.close()
+
+    def test_mode_and_clear(self):
+        queue = self.queue()
+        queue.mthds.jbqueue()
+        queue.mthds.pickentry("")
+        queue.mthds.clearparty()
+        queue.storage.close()
+
+        loaded = self.queue()
+        self.assertEqual(loaded.mode, "priority")
+        self.assertEqual(loaded.entries.serialise(), queue.entries.serialise())
+        self.assertEqual(loaded.picked.serialise(), queue.picked.serialise())
+        self.assertFalse(loaded.currentusers)
+        loaded.mthds.clear()
+        loaded.storage.close()
+        self.assertFalse(self.queue().entries)
+
+    def test_compaction(self):
+        queue = self.queue(threshold=100)
+        for i in range(10):
+            queue.mthds.addentry(f"user{i}", f"song{i}" * 5, [])
+            queue.save()
+        queue.storage.close()
+        self.assertLess(len(self.journals()), 2)
+        with open(self.path, encoding="utf-8") as file_:
+            self.assertEqual(json.load(file_)["generation"], queue.storage.generation)
+
+        loaded = self.queue()
+        self.assertEqual(loaded.serialise(), queue.serialise())
+        loaded.storage.close()
+
+    def test_undo_checkpoint(self):
+        queue = self.queue()
+        queue.mthds.addentry("user4", "song4", [])
+        queue.mthds.undo()
+        queue.save()
+        queue.storage.close()
+        self.assertEqual(self.journals(), [])
+        self.assertNotIn("user4", self.queue())
+
+    def test_torn_write(self):
+        queue = self.queue()
+        queue.mthds.addentry("user4", "song4", [])
+        queue.storage.close()
+        with open(os.path.join(self.tempdir.name, "channel.1.journal"), "a") as file_:
+            file_.write('["add","user5"')
+
+        loaded = self.queue()
+        self.assertIn("user4", loaded)
+        self.assertNotIn("user5", loaded)
+        loaded.storage.close()
+
+
+class TestDirtySaves(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tempdir.name, "channel.json")
+        self.queue = SongQueue("channel", *DATA, storage=JsonStorage(path))
+
+    def tearDown(self):
+        self.queue.storage.close()
+        self.tempdir.cleanup()
+
+    def test_skip_clean_save(self):
+        with patch.object(self.queue.storage, "save") as save:
+            self.queue.mthds.status("user1")
+            self.queue.mthds.listentries("")
+            self.queue.mthds.leave("nobody")
+            self.queue.save()
+            save.assert_not_called()
+
+            self.queue.mthds.leave("user1")
+            self.queue.save()
+            self.queue.save()
+            self.assertEqual(save.call_count, 1)
+
+            self.queue.mthds.undo()
+            self.queue.save()
+            self.assertEqual(save.call_count, 2)
+
+
+class TestBackgroundWriter(unittest.TestCase):
+    def test_merge_burst(self):
+        writes = []
+        writer = BackgroundWriter(writes.append, interval=0.2)
+        for state in range(5):
+            writer.submit(state)
+        writer.flush()
+        self.assertEqual(writes, [4])
+        writer.submit(5)
+        writer.close()
+        self.assertEqual(writes, [4, 5])
+
+    def test_failed_write(self):
+        writes = []
+
+        def write(data):
+            if data == "bad":
+                raise TypeError("not serialisable")
+            writes.append(data)
+
+        writer = BackgroundWriter(write, interval=0)
+        with patch("builtins.print") as print_:
+            writer.submit("bad")
+            writer.flush()
+            writer.submit(1)
+            writer.close()
+        self.assertIn("Failed to save queue", print_.call_args.args[0])
+        self.assertEqual(writes, [1])
+        self.assertFalse(writer._thread.is_alive())
+
+    def test_json_round_trip(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            storage = JsonStorage(os.path.join(tempdir, "channel.json"), interval=10)
+            storage.save(lambda: {"entries": DATA})
+            storage.save(lambda: {"entries": DATA[:1]})
+            storage.close()
+            self.assertEqual(storage.load(), {"entries": [["user1", "song1"]]})
+            self.assertEqual(os.listdir(tempdir), ["channel.json"])
+
+
+class TestSnapshotStorage(unittest.TestCase):
+    def test_switch_from_json(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            json_storage = JsonStorage(os.path.join(tempdir, "channel.json"))
+            queue = SongQueue("channel", *DATA, storage=json_storage)
+            queue.mthds.pickentry("", 1)
+            queue.close()
+
+            storage = SnapshotStorage(os.path.join(tempdir, "channel.qbs"))
+            loaded = SongQueue("channel", storage=storage)
+            self.assertEqual(loaded.serialise(), queue.serialise())
+            loaded.mthds.leave("user2")
+            loaded.close()
+            self.assertTrue(os.path.exists(storage.path))
+            self.assertNotIn("user2", SongQueue("channel", storage=storage))
+            storage.close()
+
+
+class TestSqliteStorage(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, "queuebot.db")
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def queue(self, channel="channel", *tuples):
+        return SongQueue(channel, *tuples, storage=SqliteStorage(self.path, channel))
+
+    def assertSameQueue(self, first, second):
+        self.assertEqual(first.serialise()["entries"], second.serialise()["entries"])
+        self.assertEqual(first.picked.serialise(), second.picked.serialise())
+        self.assertEqual(first.current, second.current)
+        self.assertEqual(list(first.currentusers), list(second.currentusers))
+        self.assertEqual((first.mode, first.isopen), (second.mode, second.isopen))
+
+    def test_changes(self):
+        queue = self.queue("channel", *DATA)
+        queue.mthds.addentry("user4", "song4", [])
+        queue.mthds.addentry("USER1", "song5", [])
+        queue.mthds.removeentry("", 2)
+        queue.mthds.pickentry("", 3)
+        queue.mthds.close()
+        queue.close()
+        loaded = self.queue()
+        self.assertSameQueue(loaded, queue)
+        self.assertEqual(loaded.entries["user1"], "song5")
+
+        loaded.mthds.jbqueue()
+        loaded.mthds.pickentry("")
+        loaded.mthds.clearparty()
+        loaded.mthds.addentry("user1")
+        loaded.mthds.pickentry("")
+        loaded.close()
+        self.assertSameQueue(self.queue(), loaded)
+
+    def test_channels(self):
+        first = self.queue("first", *DATA)
+        second = self.queue("second", *DATA[:1])
+        first.mthds.clear()
+        second.mthds.undo()
+        first.close()
+        second.close()
+        self.assertFalse(self.queue("first").entries)
+        self.assertEqual(self.queue("second").serialise()["entries"], DATA[:1])
+
+
+class TestGetStorage(unittest.TestCase):
+    def test_get_storage(self):
+        self.assertIsInstance(get_storage("channel"), JsonStorage)
+        self.assertIsInstance(get_storage("channel", "Journal"), JournalStorage)
+        self.assertIsInstance(get_storage("channel", "snapshot"), SnapshotStorage)
+        self.assertRaises(ValueError, get_storage, "channel", "xml")
@@ -6,6 +6,8 @@ from queuebot import tools
 PAGE_LENGTH = 100
 STRING_LENGTH = 5
 SEPARATOR = "."
+# Letter followed by far more combining marks than fit on a page
+ZALGO = "a" + "\u0301" * 400
 
 with open("src/queuebot/tests/tools/text_testdata.json", encoding="UTF-8") as fd_:
     testdata = json.load(fd_)
@@ -63,6 +65,55 @@ class TestPaginate(unittest.TestCase):
             generate_all_pages(" "), EXPECTED_RESULTS["iter"]["long string"]["space"]
         )
 
+    def test_many_pages(self):
+        data = SEPARATOR.join(f"entry {index}" for index in range(5000))
+        pages = list(tools.text.Paginate(data, PAGE_LENGTH, SEPARATOR))
+        self.assertTrue(all(len(tools.text.to_bytes(page)) < PAGE_LENGTH for page in pages))
+        self.assertTrue(pages[-1].endswith(f"entry 4999 (page {len(pages)}/{len(pages)})"))
+        self.assertEqual(
+            "".join(page.rsplit(" (page", 1)[0] + SEPARATOR for page in pages)[:-1], data
+        )
+
+    def test_long_cluster(self):
+        pages = list(tools.text.Paginate("hi " + ZALGO, PAGE_LENGTH, SEPARATOR))
+        self.assertTrue(all(len(tools.text.to_bytes(page)) < PAGE_LENGTH for page in pages))
+        self.assertTrue(all("\u0301" in page for page in pages[1:]))
+        text = "".join(page.rsplit(" (page", 1)[0].removesuffix("\u2026") for page in pages)
+        self.assertEqual(text, "hi " + ZALGO)
+
+
+class TestListing(unittest.TestCase):
+    def setUp(self):
+        self.items = [f"song{i}" for i in range(10)]
+        self.rendered = []
+        self.listing = tools.text.Listing(
+            (len(item) for item in self.items), self.render, 50, "Played: "
+        )
+
+    def render(self, start, stop):
+        self.rendered.extend(range(start, stop))
+        return self.items[start:stop]
+
+    def test_pages(self):
+        self.assertEqual(len(self.listing), 3)
+        self.assertEqual(self.listing[1], "Played: song0, song1, song2 (page 1/3)")
+        self.assertEqual(self.rendered, [0, 1, 2])
+        self.assertEqual(self.listing[-1], "song7, song8, song9 (page 3/3)")
+        self.assertEqual(self.listing[2], "song3, song4, song5, song6 (page 2/3)")
+        for page in ("x", 0, 4, -4):
+            self.assertEqual(self.listing[page], self.listing[1])
+        self.assertEqual(sorted(self.rendered), list(range(10)))
+
+    def test_short(self):
+        listing = tools.text.Listing(
+            [5, 60], lambda start, stop: ["a" * 5, "b" * 60][start:stop], 50
+        )
+        self.assertEqual(listing[1], "aaaaa (page 1/2)")
+        self.assertEqual(listing[2], "b" * 30 + " (page 2/2)")
+        self.assertEqual(tools.text.Listing([], None, 50, "Played: ")[1], "Played:")
+        listing = tools.text.Listing([5], lambda start, stop: ["a" * 5], 50, "Played: ")
+        self.assertEqual(listing[1], "Played: aaaaa")
+
 
 class TestFunctions(unittest.TestCase):
     """Test the functions in the tools.text module."""
@@ -93,6 +144,48 @@ class TestFunctions(unittest.TestCase):
             [tuple(element) for element in EXPECTED_RESULTS["trim bytes"]["long unicode string"]],
         )
 
+    def test_trim_long_cluster(self):
+        self.assertEqual(tools.text.trim_bytes("hi " + ZALGO, 100), ("hi a" + "\u0301" * 48, 100))
+
+    def test_fit_bytes(self):
+        data = tools.text.to_bytes("ab\u00e9e\u0301\U0001f469\u200d\U0001f4bb!")
+        self.assertEqual(
+            [tools.text.fit_bytes(data, limit) for limit in range(len(data) + 1)],
+            [0, 1, 2, 2, 4, 4, 4, *[7] * 11, 18, 19],
+        )
+        self.assertEqual(tools.text.fit_bytes(data, 16, 11), 14)
+        zalgo = tools.text.to_bytes("hi " + ZALGO)
+        self.assertEqual(tools.text.fit_bytes(zalgo, 100), 100)
+        self.assertEqual(tools.text.fit_bytes(zalgo, 101, 98), 100)
+        self.assertEqual(tools.text.fit_bytes(data, -1), 0)
+
+    def test_fit_chars(self):
+        text = "ab\u00e9e\u0301\U0001f469\u200d\U0001f4bb!"
+        self.assertEqual(
+            [tools.text.fit_chars(text, limit) for limit in range(len(text) + 1)],
+            [0, 1, 2, 3, 3, 5, 5, 5, 8, 9],
+        )
+        self.assertEqual(tools.text.fit_chars(ZALGO, 50), 50)
+        self.assertEqual(tools.text.fit_chars("e\u0301", 1), 1)
+
+    def test_page_of(self):
+        items = [f"song{i}" for i in range(10)]
+        self.assertEqual(
+            tools.text.page_of(items, 1, 100, "Played: "), "Played: " + ", ".join(items)
+        )
+        self.assertEqual(
+            tools.text.page_of(items, 2, 50, "Played: "), "Played: song3, song4, song5 (page 2/4)"
+        )
+        self.assertEqual(tools.text.page_of(items, -1, 50, "Played: "), "Played: song9 (page 4/4)")
+        self.assertEqual(tools.text.page_of(items, -4, 50), tools.text.page_of(items, 1, 50))
+        for page in ("x", 0, 5, -5):
+            self.assertEqual(tools.text.page_of(items, page, 50), tools.text.page_of(items, 1, 50))
+        self.assertEqual(
+            tools.text.page_of(iter(items), 1, 50, "Played: "),
+            "Played: song0, song1, song2 (page 1/4)",
+        )
+        self.assertEqual(tools.text.page_of([], 1, 50, "Played: "), "Played:")
+
     def test_colourise(self):
         results = [tools.text.colourise(DATA["long string"], colour) for colour in DATA["colours"]]
         self.assertSequenceEqual(results, EXPECTED_RESULTS["colourise"])
@@ -0,0 +1,160 @@
+import unittest
+
+from queuebot.tools.tiered_list import PooledList, RandomPool, TieredList
+from queuebot.tools.tuple_list import TupleList
+
+DATA = [
+    ("Username 1", "Song Request 1"),
+    ("Username 2", "Song Request 2"),
+    ("Username 3", "Song Request 3"),
+    ("Username 4", "Song Request 4"),
+]
+
+
+# ruff: noqa: D101, D102
+class TestTieredList(unittest.TestCase):
+    def setUp(self):
+        self.picked = TupleList(*DATA[:2])
+        self.t_l = TieredList(lambda key: int(key in self.picked), *DATA)
+
+    def test_order(self):
+        self.assertEqual(self.t_l.serialise(), DATA[2:] + DATA[:2])
+        for index, (key, _value) in enumerate(DATA[2:] + DATA[:2]):
+            self.assertEqual(self.t_l.index(key), index)
+        self.assertRaises(ValueError, self.t_l.index, "new user")
+
+    def test_many_tiers(self):
+        counts = {key: 3 - index for index, (key, _value) in enumerate(DATA)}
+        t_l = TieredList(counts.get, *DATA)
+        self.assertEqual(t_l.serialise(), DATA[::-1])
+        counts["new user"] = 2
+        t_l["new user"] = "new song"
+        self.assertEqual(t_l.index("new user"), 3)
+        self.assertEqual(t_l.pop(t_l.choose()), DATA[3])
+        self.assertEqual(t_l.pop(t_l.choose()), DATA[2])
+
+    def test_with_prefix(self):
+        self.assertIsNone(self.t_l._key_trie)
+        self.assertEqual(
+            self.t_l.with_prefix("USERNAME"),
+            [(index, *pair) for index, pair in enumerate(DATA[2:] + DATA[:2])],
+        )
+        self.t_l.pop(0)
+        self.t_l.pop(self.t_l.choose(first=True))
+        del self.t_l[DATA[0][0]]
+        self.t_l["user 5"] = "song 5"
+        self.assertEqual(self.t_l.with_prefix("user"), [(0, "user 5", "song 5"), (1, *DATA[1])])
+        self.assertEqual(self.t_l.with_prefix("Username 1"), [])
+
+    def test_setitem(self):
+        self.t_l["new user"] = "new song"
+        self.assertEqual(self.t_l.index("new user"), 2)
+        self.t_l[DATA[3][0].upper()] = "changed"
+        self.assertEqual(self.t_l.index(DATA[3][0]), 1)
+        self.assertEqual(self.t_l[DATA[3][0]], "changed")
+        self.assertEqual(len(self.t_l), len(DATA) + 1)
+
+    def test_delitem(self):
+        for key, _value in DATA:
+            del self.t_l[key]
+            self.assertNotIn(key, self.t_l)
+        self.assertFalse(self.t_l)
+        with self.assertRaises(ValueError):
+            del self.t_l[DATA[0][0]]
+
+    def test_pop(self):
+        self.assertEqual(self.t_l.pop(2), DATA[0])
+        self.assertEqual(self.t_l.pop(-1), DATA[1])
+        self.assertEqual(self.t_l.pop(0), DATA[2])
+        self.assertRaises(IndexError, self.t_l.pop, 1)
+        self.assertEqual(len(self.t_l), 1)
+
+    def test_choose(self):
+        for expected in DATA[2:]:
+            self.assertEqual(self.t_l.choose(first=True), 0)
+            self.assertEqual(self.t_l.pop(0), expected)
+        self.assertEqual({self.t_l.pop(self.t_l.choose()) for _ in DATA[:2]}, set(DATA[:2]))
+        self.assertRaises(IndexError, self.t_l.choose)
+
+
+class TestPooledList(unittest.TestCase):
+    def setUp(self):
+        self.picked = TupleList(*DATA[:2])
+        self.p_l = PooledList(lambda key: int(key in self.picked), *DATA)
+
+    def test_order(self):
+        self.assertEqual(self.p_l.serialise(), DATA)
+        self.assertEqual(self.p_l.index(DATA[2][0]), 2)
+
+    def test_choose(self):
+        self.assertEqual({self.p_l.pop(self.p_l.choose()) for _ in DATA[2:]}, set(DATA[2:]))
+        self.p_l["new user"] = "new song"
+        self.assertEqual(self.p_l.choose(), 2)
+        self.assertEqual(self.p_l.pop(2), ("new user", "new song"))
+        self.assertEqual({self.p_l.pop(self.p_l.choose()) for _ in DATA[:2]}, set(DATA[:2]))
+        self.assertRaises(IndexError, self.p_l.choose)
+
+    def test_removal(self):
+        del self.p_l[DATA[2][0]]
+        self.p_l.pop(2)
+        for _ in DATA[:2]:
+            self.assertIn(self.p_l.pop(self.p_l.choose()), DATA[:2])
+        self.assertFalse(self.p_l)
+
+    def test_search(self):
+        self.assertEqual(self.p_l.search("REQUEST 3"), [(2, *DATA[2])])
+        self.p_l.pop(0)
+        self.p_l[DATA[3][0]] = "changed"
+        self.p_l.merge([(DATA[1][0], "Song changed")])
+        self.assertEqual(self.p_l.search("song"), [(0, DATA[1][0], "Song changed"), (1, *DATA[2])])
+        self.assertEqual(self.p_l.search("SO"), self.p_l.search("song"))
+        self.assertEqual(
+            self.p_l.search("changed"),
+            [(0, DATA[1][0], "Song changed"), (2, DATA[3][0], "changed")],
+        )
+        self.assertEqual(self.p_l.search("request 1"), [])
+
+    def test_key_lookup(self):
+        self.p_l["user 5"] = "song 5"
+        self.assertEqual(self.p_l.with_prefix("user 5"), [(4, "user 5", "song 5")])
+        self.assertEqual(len(self.p_l.with_prefix("USER")), 5)
+        self.p_l.pop(0)
+        self.assertEqual(self.p_l.search_keys("NAME 2"), [(0, *DATA[1])])
+        self.assertEqual(self.p_l.search_keys("1"), [])
+        self.assertEqual(self.p_l.with_prefix("username 1"), [])
+
+    def test_lazy_indexes(self):
+        p_l = PooledList(lambda _key: 0, *((f"user {i}", f"song {i}") for i in range(1000)))
+        self.assertEqual(len({entry.added for entry in p_l.records()}), 1)
+        self.assertEqual(p_l._indexes, {})
+        self.assertEqual(p_l.search_keys("user 999"), [(999, "user 999", "song 999")])
+        self.assertEqual(list(p_l._indexes), ["key"])
+        del p_l["user 999"]
+        self.assertEqual(p_l.search_keys("user 999"), [])
+        self.assertEqual(len(p_l.with_prefix("user 99")), 10)
+
+    def test_similar(self):
+        self.p_l["new user"] = "song request #3"
+        self.assertEqual(
+            self.p_l.similar("Song Request 3!", 0.9),
+            [(1.0, 2, *DATA[2]), (1.0, 4, "new user", "song request #3")],
+        )
+        self.assertEqual(self.p_l.similar("request", 0.8), [])
+        self.p_l.pop(2)
+        self.assertEqual(len(self.p_l.similar("request", 0.5, partial=True)), 4)
+
+
+class TestRandomPool(unittest.TestCase):
+    def test_pool(self):
+        pool = RandomPool(*range(10))
+        for key in range(0, 10, 2):
+            pool.discard(key)
+        pool.discard(0)
+        pool.add(1)
+        self.assertEqual(len(pool), 5)
+        self.assertEqual({pool.choice() for _ in range(200)}, set(range(1, 10, 2)))
+        for key in range(1, 10, 2):
+            self.assertIn(key, pool)
+            pool.discard(key)
+        self.assertFalse(pool)
+        self.assertRaises(IndexError, pool.choice)
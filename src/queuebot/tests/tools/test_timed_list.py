@@ -1,5 +1,6 @@
 import unittest
-from time import sleep
+from time import sleep, time
+from unittest.mock import patch
 
 from queuebot.tools import timed_list
 
@@ -76,3 +77,11 @@ class TestTimedList(unittest.TestCase):
     def test_contains(self):
         for item in DATA:
             self.assertIn(item, self.t_l)
+
+    def test_clock_change(self):
+        with patch("queuebot.tools.timed_list.time", return_value=time() + 3600):
+            self.assertListEqual(self.t_l.get(), DATA)
+        with patch("queuebot.tools.timed_list.time", return_value=time() - 3600):
+            self.assertListEqual(self.t_l.get(), DATA)
+        sleep(DELAY)
+        self.assertListEqual(self.t_l.get(), [])
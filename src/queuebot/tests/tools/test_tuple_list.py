@@ -1,6 +1,6 @@
 import unittest
 
-from queuebot.tools.tuple_list import TupleList
+from queuebot.tools.tuple_list import Entry, TupleList
 
 DATA = [
     ("Username 1", "Song Request 1"),
@@ -36,6 +36,26 @@ class TestTupleList(unittest.TestCase):
         for key, _value in DATA:
             self.assertIn(key, self.t_l)
 
+    def test_case_insensitive(self):
+        for index, (key, value) in enumerate(DATA):
+            self.assertIn(key.upper(), self.t_l)
+            self.assertEqual(self.t_l[key.casefold()], value)
+            self.assertEqual(self.t_l.index(key.swapcase()), index)
+        self.t_l[DATA[0][0].upper()] = "new value"
+        self.assertEqual(len(self.t_l), len(DATA))
+        self.assertEqual(self.t_l.pop(0), (DATA[0][0].upper(), "new value"))
+
+    def test_index(self):
+        for index, (key, _value) in enumerate(DATA):
+            self.assertEqual(self.t_l.index(key), index)
+        self.t_l.pop(1)
+        self.assertRaises(ValueError, self.t_l.index, DATA[1][0])
+        for index, (key, _value) in enumerate(DATA[:1] + DATA[2:]):
+            self.assertEqual(self.t_l.index(key), index)
+        self.t_l.append(DATA[0])
+        self.t_l.pop(0)
+        self.assertEqual(self.t_l.index(DATA[0][0]), len(self.t_l) - 1)
+
     def test_delitem(self):
         for key, _value in DATA:
             self.assertIn(key, self.t_l)
@@ -99,11 +119,30 @@ class TestTupleList(unittest.TestCase):
         new_t_l -= self.front
         self.assertEqual(new_t_l, TupleList())
 
-    def test_deprioritise(self):
-        new_t_l = self.t_l.deprioritise()
+    def test_extend_many(self):
+        new_t_l = TupleList()
+        new_t_l.extend_many(DATA[:1])
+        new_t_l.extend_many(DATA[1:])
         self.assertEqual(new_t_l, self.t_l)
-        new_t_l = new_t_l.deprioritise(self.front)
-        self.assertEqual(new_t_l, TupleList(*self.split_data[1], *self.split_data[0]))
+        new_t_l.pop(0)
+        new_t_l.extend_many([DATA[0], DATA[0]])
+        self.assertEqual(new_t_l.serialise(), [*DATA[1:], DATA[0], DATA[0]])
+        self.assertEqual(new_t_l.index(DATA[0][0]), len(DATA) - 1)
+
+    def test_remove_many(self):
+        keys = [key.upper() for key, _value in self.split_data[0]] + ["missing"]
+        self.assertEqual(self.t_l.remove_many(keys), self.split_data[0])
+        self.assertEqual(self.t_l, self.back)
+        self.assertEqual(self.t_l.index(self.split_data[1][0][0]), 0)
+        self.assertEqual(self.t_l.remove_many([]), [])
+
+    def test_merge(self):
+        self.front.merge(self.back)
+        self.assertEqual(self.front, self.t_l)
+        self.t_l.merge([(DATA[0][0], "new value"), ("new key", "a"), ("NEW KEY", "b")])
+        self.assertEqual(
+            self.t_l.serialise(), [(DATA[0][0], "new value"), *DATA[1:], ("NEW KEY", "b")]
+        )
 
     def test_pop(self):
         for expected_key, expected_value in DATA:
@@ -117,36 +156,28 @@ class TestTupleList(unittest.TestCase):
             self.assertEqual(key, expected_key)
             self.assertEqual(value, expected_value)
 
-    def test_random(self):
-        unpicked_keys = [key for key, _value in self.split_data[0]]
-        picked_keys = [key for key, _value in self.split_data[1]]
-        all_keys = [key for key, _value in DATA]
-
-        front_length = len(DATA) // 2
-        back_length = len(DATA) - front_length
-
-        for _ in range(front_length):
-            (key, value), picked = self.t_l.random(self.back)
-            self.assertFalse(picked)
-            self.assertIn(key, unpicked_keys)
-
-        for _ in range(back_length):
-            (key, value), picked = self.t_l.random(self.back)
-            self.assertTrue(picked)
-            self.assertIn(key, picked_keys)
-
-        self.load_data()
-        for _ in range(front_length + back_length):
-            (key, value), picked = self.t_l.random()
-            self.assertFalse(picked)
-            self.assertIn(key, all_keys)
-
-        self.load_data()
-        for expected_key, expected_value in DATA:
-            (key, value), picked = self.t_l.random(first=True)
-            self.assertFalse(picked)
-            self.assertEqual(key, expected_key)
-            self.assertEqual(value, expected_value)
+    def test_pop_large(self):
+        keys = [f"user {index}" for index in range(1000)]
+        self.t_l = TupleList(*[(key, key) for key in keys])
+        for _ in range(300):
+            self.assertEqual(self.t_l.pop(0)[0], keys.pop(0))
+            self.assertEqual(self.t_l.pop(-1)[0], keys.pop(-1))
+            self.assertEqual(self.t_l.pop(100)[0], keys.pop(100))
+        self.assertRaises(IndexError, self.t_l.pop, len(keys))
+        self.assertEqual([key for key, _value in self.t_l], keys)
+        for index in range(0, len(keys), 7):
+            self.assertEqual(self.t_l.index(keys[index]), index)
+
+    def test_records(self):
+        records = list(self.t_l.records())
+        self.assertTrue(all(isinstance(record, Entry) for record in records))
+        self.assertEqual([record.pair() for record in records], DATA)
+        first = records[0]
+        self.t_l[first.key.upper()] = "new value"
+        record = next(self.t_l.records())
+        self.assertEqual(record.added, first.added)
+        self.assertIs(record.folded, first.folded)
+        self.assertEqual(TupleList(*records), TupleList(*DATA))
 
     def test_serialise(self):
         data = self.t_l.serialise()
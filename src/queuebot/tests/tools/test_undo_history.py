@@ -0,0 +1,48 @@
+import unittest
+
+from queuebot.tools.undo_history import UndoHistory
+
+
+# ruff: noqa: D101, D102
+class TestUndoHistory(unittest.TestCase):
+    def setUp(self):
+        self.history = UndoHistory(limit=3)
+        self.reverted = []
+
+    def revert(self, step):
+        self.reverted.append(step)
+        return -step
+
+    def test_undo_redo(self):
+        for step in range(1, 4):
+            self.history.record(step)
+        self.history.undo(self.revert)
+        self.history.undo(self.revert)
+        self.history.redo(self.revert)
+        self.history.redo(self.revert)
+        self.assertRaises(IndexError, self.history.redo, self.revert)
+        self.assertEqual(self.reverted, [3, 2, -2, -3])
+        self.assertEqual(len(self.history), 3)
+        self.history.undo(self.revert)
+        self.assertEqual(self.reverted[-1], 3)
+
+    def test_record_clears_redo(self):
+        self.history.record(1)
+        self.history.undo(self.revert)
+        self.history.record(2)
+        self.assertRaises(IndexError, self.history.redo, self.revert)
+
+    def test_failed_revert(self):
+        self.history.record(1)
+        self.assertRaises(ZeroDivisionError, self.history.undo, lambda step: step / 0)
+        self.assertEqual(len(self.history), 1)
+
+    def test_limit(self):
+        for step in range(5):
+            self.history.record(step)
+        for _ in range(3):
+            self.history.undo(self.revert)
+        self.assertEqual(self.reverted, [4, 3, 2])
+        self.assertRaises(IndexError, self.history.undo, self.revert)
+        self.history.clear()
+        self.assertRaises(IndexError, self.history.redo, self.revert)
@@ -5,13 +5,23 @@ __all__ = ["text"]
 """Miscellaneous tools for handling things like chat, config, queues et al.
 
 Modules:
+    catalog: Song catalog that free text requests can be matched against.
     chat: Tools for chat based commands.
     config: Tools to handle configuration of the bot.
     get_emotes: Retrieve emote strings for the given channels.
     highlight_string: Tools to highlight a string with colour.
+    pick_history: History of the picks made from a queue, with older picks
+        kept on disk.
+    search_index: Indexes for searching the text held in a queue without
+        scanning it.
+    snapshot: Compact binary snapshots of queue data.
     song_queue: Tools for managing a random or prioritised request queue.
+    storage: Storage backends used to persist a SongQueue between runs.
     text: Tools for formatting / manipulating text.
+    tiered_list: A TupleList split into priority tiers that stay in order as
+        keys are added.
     timed_list: Manages a list erases its content after a specified time delay.
     tuple_list: A dict-like object that maintains ordering of key: value pairs.
+    undo_history: Bounded undo / redo history of reversible steps.
     version: Autogenerated bot version.
 """
@@ -0,0 +1,213 @@
+"""Song catalog that free text requests can be matched against.
+
+A catalog file lists one song title per line, blank lines and lines starting
+with "#" are ignored. Titles are indexed by their normalised text in a sorted
+list, so a request naming the start of a title can be completed by bisecting
+it, and a FuzzyIndex, so misspelt requests can be matched to their closest
+titles.
+
+The catalog never changes while the bot runs, so its prefix index is a flat
+sorted list rather than a PrefixTrie: the list can be cached as is, while a
+trie would have to be rebuilt node by node. The index is cached in a binary
+snapshot next to the catalog file, and reused while the catalog is unchanged.
+
+Classes:
+    Catalog: Song titles indexed for matching requests against.
+
+Functions:
+    load_catalog: Load the catalog file at the given path, if there is one.
+"""
+
+import os
+from bisect import bisect_left
+from itertools import islice, takewhile
+from traceback import format_exc
+
+from . import snapshot
+from .search_index import FuzzyIndex, normalise
+from .text import colourise as col
+
+# Bumped whenever the layout of the cached index changes
+CACHE_VERSION = 1
+# Lowest trigram similarity for a title to be considered a candidate match
+CANDIDATE_SIMILARITY = 0.3
+# Number of candidates compared by edit distance, best trigram scores first
+CANDIDATE_LIMIT = 20
+# Lowest edit similarity for a request to be mapped to a title without asking
+MATCH_SIMILARITY = 0.85
+# Lowest edit similarity for a title to be offered as a suggestion
+SUGGEST_SIMILARITY = 0.5
+# Number of titles offered as suggestions
+SUGGESTION_LIMIT = 3
+# Number of titles starting with a request looked at for suggestions
+PREFIX_LIMIT = 50
+
+
+class Catalog:
+    """Song titles indexed for matching requests against.
+
+    Attributes:
+        path: Path of the catalog file.
+        cache_path: Path of the cached index.
+    """
+
+    def __init__(self, path):
+        """Load the catalog, using the cached index if it is up to date.
+
+        Args:
+            path: Path of the catalog file.
+
+        Raises:
+            OSError: If the catalog file can't be read.
+        """
+        self.path = path
+        self.cache_path = f"{path}.idx"
+        self._titles = {}
+        self._sorted = []
+        self._fuzzy = None
+        source = self._source()
+        if not self._load_cache(source):
+            self._build()
+            self._save_cache(source)
+
+    def __contains__(self, title):
+        """Return True if the catalog holds the given title."""
+        return normalise(title) in self._titles
+
+    def __len__(self):
+        """Return the number of titles in the catalog."""
+        return len(self._titles)
+
+    def match(self, text):
+        """Find the catalog title a request refers to.
+
+        Requests are matched, in order of preference, to the title with the
+        same normalised text, the only title starting with the request, or a
+        single title within a small edit distance of it.
+
+        Args:
+            text: Free text of the request.
+
+        Returns:
+            2-tuple (title, suggestions). title is the matching title, or None
+            if the request couldn't be matched to a single title, in which
+            case suggestions lists the closest titles, best first.
+        """
+        key = normalise(text)
+        if not key:
+            return None, []
+        if key in self._titles:
+            return self._titles[key], []
+        prefixed = sorted(islice(self._with_prefix(key), PREFIX_LIMIT), key=len)
+        if len(prefixed) == 1:
+            return self._titles[prefixed[0]], []
+        ranked = self._closest(key)
+        if (
+            ranked
+            and ranked[0][0] >= MATCH_SIMILARITY
+            and (len(ranked) == 1 or ranked[1][0] < ranked[0][0])
+        ):
+            return self._titles[ranked[0][1]], []
+        keys = prefixed + [key for score, key in ranked if score >= SUGGEST_SIMILARITY]
+        suggestions = list(dict.fromkeys(keys))[:SUGGESTION_LIMIT]
+        return None, [self._titles[key] for key in suggestions]
+
+    def _with_prefix(self, prefix):
+        """Yield the normalised titles starting with prefix, in order."""
+        start = bisect_left(self._sorted, prefix)
+        return takewhile(lambda key: key.startswith(prefix), islice(self._sorted, start, None))
+
+    def _closest(self, key):
+        """Return the titles closest to key as (similarity, key) pairs.
+
+        Candidates sharing enough trigrams with key are found in the fuzzy
+        index, then the best of them are compared by edit distance.
+        """
+        scores = self._fuzzy.similar(key, CANDIDATE_SIMILARITY)
+        candidates = sorted(scores, key=scores.get, reverse=True)[:CANDIDATE_LIMIT]
+        ranked = [
+            (1 - _edit_distance(key, title) / max(len(key), len(title)), title)
+            for title in candidates
+        ]
+        return sorted(ranked, key=lambda pair: (-pair[0], len(pair[1])))
+
+    def _source(self):
+        """Return the catalog file's size and modification time."""
+        stat = os.stat(self.path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def _build(self):
+        """Index the titles listed in the catalog file."""
+        with open(self.path, "r", encoding="utf-8") as file_:
+            for line in file_:
+                title = line.strip()
+                key = normalise(title)
+                if key and not title.startswith("#"):
+                    self._titles.setdefault(key, title)
+        self._sorted = sorted(self._titles)
+        self._fuzzy = FuzzyIndex()
+        for key in self._titles:
+            self._fuzzy.add(key, key)
+
+    def _load_cache(self, source):
+        """Load the cached index, returning False if it is missing or stale."""
+        try:
+            with open(self.cache_path, "rb") as file_:
+                data = snapshot.loads(file_.read())
+            if data["version"] != CACHE_VERSION or data["source"] != source:
+                return False
+            self._titles = data["titles"]
+            self._sorted = data["sorted"]
+            self._fuzzy = FuzzyIndex(**data["grams"])
+        except (OSError, ValueError, LookupError, TypeError):
+            return False
+        return True
+
+    def _save_cache(self, source):
+        """Cache the index next to the catalog file, if it can be written."""
+        data = {
+            "version": CACHE_VERSION,
+            "source": source,
+            "titles": self._titles,
+            "sorted": self._sorted,
+            "grams": self._fuzzy.serialise(),
+        }
+        try:
+            with open(self.cache_path, "wb") as file_:
+                file_.write(snapshot.dumps(data))
+        except OSError:
+            print(col(f"Couldn't cache the song catalog index at {self.cache_path}", "GREY"))
+
+
+def load_catalog(path):
+    """Load the catalog file at the given path, if there is one.
+
+    Args:
+        path: Path of the catalog file, or "" for no catalog.
+
+    Returns:
+        The loaded Catalog, or None if no path was given or the file couldn't
+        be read.
+    """
+    if not path:
+        return None
+    try:
+        return Catalog(path)
+    except OSError:
+        print(col(f"\n{format_exc()}\nFailed to load the song catalog", "GREY"))
+        return None
+
+
+def _edit_distance(first, second):
+    """Return the Levenshtein distance between two strings."""
+    if len(first) < len(second):
+        first, second = second, first
+    previous = list(range(len(second) + 1))
+    for i, char in enumerate(first, 1):
+        current = [i]
+        for j, other in enumerate(second, 1):
+            current.append(
+                min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other))
+            )
+        previous = current
+    return previous[-1]
@@ -66,6 +66,8 @@ class CommandHandler:
             "listaliases": ("e", "list_aliases", 10),
             "testqueue": ("m", "testqueue", 10),
             "queueconfirm": ("m", "queueconfirm", 0),
+            "undo": ("m", "undo", 1),
+            "redo": ("m", "redo", 1),
         }
         self.cooldowns = {}
         self.aliases = {
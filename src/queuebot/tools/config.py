@@ -28,6 +28,10 @@ DEFAULTS = {
     "muted": "False",
     "logging": "False",
     "startup_msg": "True",
+    "storage": "json",
+    "save_interval": "1",
+    "history_window": "500",
+    "catalog": "",
 }
 
 
@@ -3,6 +3,8 @@
 Classes:
     Highlighter: Take a string and return a version with ANSI colour codes
         inserted.
+    StringMatcher: Aho-Corasick automaton finding every occurrence of a set
+        of substrings in a single pass over a string.
 
 Functions:
     find_strings: Take a string and a list of substrings, then return a list of
@@ -10,6 +12,7 @@ Functions:
         string.
 """
 
+from collections import deque
 from typing import Optional
 
 HIGHLIGHT_COLOUR = "\x1b[36;1m"
@@ -48,9 +51,9 @@ class Highlighter:
         self.string = string
         substrings = substrings if substrings is not None else []
         indices = indices if indices is not None else []
-        indices += list(set(find_strings(string, substrings)))
         if emote:
             indices = [index for index in indices if _is_emote(string, index)]
+        indices += StringMatcher(substrings).find(string, emote)
         self.indices = list(set(indices))
 
     def get_highlight(self):
@@ -62,49 +65,139 @@ class Highlighter:
         return self.string
 
 
+class StringMatcher:
+    """Aho-Corasick automaton for finding a set of substrings in a string.
+
+    The automaton is built once from the substrings, then each search walks
+    the string a single time, however many substrings there are. Nodes are
+    held in parallel lists indexed by node number: the transitions out of
+    each node, the node to fall back to when no transition matches, and the
+    substrings ending at the node, as their lengths and final nodes.
+
+    A built matcher is never changed, so a new one can be swapped in for it
+    while other threads are searching with the old one.
+    """
+
+    def __init__(self, substrings=()):
+        """Build the automaton.
+
+        Args:
+            substrings: Iterable of strings to search for. Empty strings are
+                ignored.
+        """
+        self._goto = [{}]
+        self._fail = [0]
+        self._ends = [()]
+        for substring in set(substrings):
+            if substring:
+                self._add(substring)
+        self._link()
+
+    def __bool__(self):
+        """Return True if the matcher has any substrings to search for."""
+        return len(self._goto) > 1
+
+    def find(self, string, emote=False):
+        """Search the given string for occurrences of the substrings.
+
+        Each substring's occurrences are found left to right without
+        overlapping each other, though occurrences of different substrings
+        may overlap.
+
+        Args:
+            string: String to search.
+            emote: Flag to only return the occurrences that are whole words,
+                see _is_emote.
+
+        Returns:
+            Sorted list of position 2-tuples for each occurrence found.
+        """
+        if not self:
+            return []
+        goto, fail, ends = self._goto, self._fail, self._ends
+        found, last_end, node = [], {}, 0
+        for pos, char in enumerate(string, 1):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for length, key in ends[node]:
+                start = pos - length
+                if start < last_end.get(key, 0):
+                    continue
+                last_end[key] = pos
+                if not emote or _is_emote(string, (start, pos)):
+                    found.append((start, pos))
+        return sorted(found)
+
+    def _add(self, substring):
+        """Add the nodes spelling out the given substring."""
+        node = 0
+        for char in substring:
+            child = self._goto[node].get(char)
+            if child is None:
+                child = len(self._goto)
+                self._goto[node][char] = child
+                self._goto.append({})
+                self._fail.append(0)
+                self._ends.append(())
+            node = child
+        self._ends[node] = ((len(substring), node),)
+
+    def _link(self):
+        """Work out each node's fallback, breadth first from the root.
+
+        Each node also takes on the substrings ending at its fallback, so a
+        search collects every substring ending at a position from one node.
+        """
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._ends[child] += self._ends[self._fail[child]]
+                queue.append(child)
+
+
 def _highlight(string, positions):
     """Return string highlighted at the given positions.
 
     Take a string and a list of position tuples, then return the string with
-    ANSI colour codes inserted at each position.
+    ANSI colour codes inserted at each position. Overlapping and duplicate
+    positions are merged, so each highlighted stretch gets one pair of codes.
 
     Args:
         string: The string to highlight.
-        positions: List or tuple with he positions to insert ANSI colour codes
+        positions: List or tuple with the positions to insert ANSI colour codes
             around.
 
     Returns:
         The string with ANSI colour codes inserted.
     """
-    exploded_string = list(string)
-    # Walk the exploded string in reverse, so that each insertion doesn't
-    # affect the position of subsequent insertions.
-    for start, reset in sorted(positions, reverse=True):
-        exploded_string.insert(reset, RESET_STR)
-        exploded_string.insert(start, HIGHLIGHT_COLOUR)
-    return "".join(exploded_string)
+    parts, pos = [], 0
+    for start, end in _merge(positions):
+        parts += (string[pos:start], HIGHLIGHT_COLOUR, string[start:end], RESET_STR)
+        pos = end
+    parts.append(string[pos:])
+    return "".join(parts)
 
 
-def _calc_indices(string, search, padding=0):
-    """Take a string and search it recursively for the given substring.
+def _merge(positions):
+    """Return the given positions sorted, with overlapping ones merged.
 
-    Args:
-        string: String to search in.
-        search: Substring to search for.
-        padding: Offset to add to the returned position indices.
-
-    Returns:
-        List of position 2-tuples for each position the substring is found at.
+    Empty positions are dropped. Positions that only touch are kept apart.
     """
-    length = len(search)
-    if length < 1:
-        raise ValueError("Search string must have non-zero length")
-    try:
-        position = string.index(search)
-        start, end = padding + position, padding + position + length
-        return [(start, end), *_calc_indices(string[position + length :], search, end)]
-    except (ValueError, RecursionError):
-        return []
+    merged = []
+    for start, end in sorted(positions):
+        if start >= end:
+            continue
+        if merged and start < merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
 
 
 def _is_emote(string: str, pos: tuple):
@@ -133,7 +226,7 @@ def find_strings(string, substrings):
     Returns:
         List of position 2-tuples for every occurrence of a substring.
     """
-    return sorted(index for sub in substrings for index in _calc_indices(string, sub))
+    return StringMatcher(substrings).find(string)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,197 @@
+"""History of the picks made from a queue, with older picks kept on disk.
+
+Classes:
+    PickHistory: Picks made from a queue, keeping only the most recent ones in
+        memory.
+    PickArchive: Append-only store of older picks, split into segment files.
+
+Functions:
+    new_archive_id: Return a fresh id to name a new archive with.
+    remove_stale_archives: Delete a channel's archives other than the given
+        one.
+"""
+
+import glob
+import json
+import os
+import uuid
+from itertools import chain
+
+# Number of recent picks kept in memory, older picks are moved to the archive
+HISTORY_WINDOW = 500
+# Number of picks held by each archive segment file
+SEGMENT_SIZE = 1000
+
+
+class PickHistory:
+    """Picks made from a queue, as (user, entry) pairs in the order made.
+
+    Only the most recent picks are held in memory. Once twice the window has
+    built up, all but the latest window of picks are moved into the archive,
+    so memory use and save size stay bounded however long the queue runs.
+
+    Positions count from the first pick ever made. The archive holds the
+    picks before base, the in-memory list holds the rest.
+    """
+
+    def __init__(self, archive, window=HISTORY_WINDOW, recent=(), base=0):
+        """Create the history.
+
+        Args:
+            archive: PickArchive holding the older picks.
+            window: Number of recent picks to keep in memory.
+            recent: Iterable of the (user, entry) pairs from position base
+                onwards.
+            base: Position of the first pair in recent.
+        """
+        self.archive = archive
+        self.window = window
+        self.recent = [tuple(pair) for pair in recent]
+        self.base = base
+
+    def __bool__(self):
+        """Return True if any picks have been made."""
+        return bool(self.recent) or self.base > 0
+
+    def __len__(self):
+        """Return the total number of picks made."""
+        return self.base + len(self.recent)
+
+    def __iter__(self):
+        """Yield the in-memory picks, oldest first."""
+        return iter(self.recent)
+
+    def append(self, pair):
+        """Add the latest pick to the history."""
+        self.recent.append(tuple(pair))
+
+    def full(self):
+        """Return True once the recent picks are due to be archived."""
+        return len(self.recent) > 2 * self.window
+
+    def rotate(self):
+        """Move all but the latest window of picks into the archive.
+
+        Picks the archive already holds, as when the queue was last saved
+        before a rotation reached disk, are skipped rather than archived
+        twice.
+
+        Returns:
+            Number of picks held by the archive afterwards.
+        """
+        count = max(len(self) - self.window, self.base)
+        start = max(len(self.archive) - self.base, 0)
+        self.archive.extend(self.recent[start : count - self.base])
+        self.trim(count)
+        return count
+
+    def trim(self, count):
+        """Drop the picks before the given position from memory.
+
+        Used once those picks are known to be in the archive.
+        """
+        if count > self.base:
+            del self.recent[: count - self.base]
+            self.base = count
+
+    def pop(self):
+        """Take back the latest pick, returning it.
+
+        Raises:
+            IndexError: If the latest pick has already been archived.
+        """
+        return self.recent.pop()
+
+    def newest(self):
+        """Yield every pick, newest first, reading the archive as needed."""
+        return chain(reversed(self.recent), self.archive.newest(self.base))
+
+    def serialise(self):
+        """Return the in-memory picks as a list of tuples."""
+        return list(self.recent)
+
+
+class PickArchive:
+    """Append-only store of picks, split into segment files.
+
+    Segment files are named "<prefix>.<number>.jsonl" and hold one JSON
+    [user, entry] pair per line. Every segment but the last is full, so a
+    pick's position gives its segment directly and reads only ever need to
+    open the segments being paged through.
+    """
+
+    def __init__(self, prefix, segment_size=SEGMENT_SIZE):
+        """Open the archive, counting the picks it already holds.
+
+        Args:
+            prefix: Path prefix for the segment files, including the
+                archive's id.
+            segment_size: Number of picks held by each segment.
+        """
+        self.prefix = prefix
+        self.id = prefix.rsplit(".", 1)[-1]
+        self.segment_size = segment_size
+        self._cache = (None, [])
+        segments = len(glob.glob(glob.escape(prefix) + ".*.jsonl"))
+        self._length = 0
+        if segments:
+            last = len(self._read(segments - 1))
+            self._length = (segments - 1) * segment_size + last
+
+    def __len__(self):
+        """Return the number of picks held by the archive."""
+        return self._length
+
+    def extend(self, pairs):
+        """Append (user, entry) pairs to the archive."""
+        pairs = list(pairs)
+        while pairs:
+            segment, offset = divmod(self._length, self.segment_size)
+            batch, pairs = pairs[: self.segment_size - offset], pairs[self.segment_size - offset :]
+            with open(self._path(segment), "a", encoding="utf-8") as file_:
+                file_.writelines(json.dumps(pair, separators=(",", ":")) + "\n" for pair in batch)
+            self._length += len(batch)
+            if self._cache[0] == segment:
+                self._cache = (None, [])
+
+    def newest(self, stop=None):
+        """Yield the archived pairs before position stop, newest first.
+
+        Segments are read one at a time, as the caller gets to them.
+        """
+        stop = self._length if stop is None else min(stop, self._length)
+        segment, offset = divmod(stop, self.segment_size)
+        if offset:
+            yield from reversed(self._read(segment)[:offset])
+        for number in range(segment - 1, -1, -1):
+            yield from reversed(self._read(number))
+
+    def _path(self, segment):
+        """Return the path of the given segment file."""
+        return f"{self.prefix}.{segment}.jsonl"
+
+    def _read(self, segment):
+        """Return the pairs held in the given segment, as tuples."""
+        if self._cache[0] != segment:
+            with open(self._path(segment), "r", encoding="utf-8") as file_:
+                self._cache = (segment, [tuple(json.loads(line)) for line in file_])
+        return self._cache[1]
+
+
+def new_archive_id():
+    """Return a fresh id to name a new archive with."""
+    return uuid.uuid4().hex[:12]
+
+
+def remove_stale_archives(directory, channel, keep):
+    """Delete a channel's archive segments, except for one archive.
+
+    Args:
+        directory: Directory holding the archives.
+        channel: Name of the channel the archives belong to.
+        keep: Id of the archive to keep.
+    """
+    prefix = os.path.join(directory, f"{channel}.picks.")
+    for name in glob.glob(glob.escape(prefix) + "*.*.jsonl"):
+        if not name[len(prefix) :].startswith(f"{keep}."):
+            os.remove(name)
@@ -0,0 +1,291 @@
+"""Indexes for searching the text held in a queue without scanning it.
+
+Classes:
+    TrigramIndex: Inverted index from trigrams to the keys whose text holds
+        them, for case-insensitive substring searches.
+    FuzzyIndex: Inverted index of normalised trigrams, scoring keys by how
+        similar their text is to a search.
+    PrefixTrie: Set of keys stored as a trie, so the keys sharing a prefix
+        can be listed without scanning them all.
+
+Functions:
+    normalise: Reduce text to casefolded, accent and punctuation free words.
+"""
+
+import math
+import unicodedata
+from collections import Counter
+
+# Length of the substrings indexed by a TrigramIndex or FuzzyIndex
+GRAM_LENGTH = 3
+# Slack allowed when working out the fewest trigrams a match must share, so
+# rounding error never prunes a key scoring exactly at the threshold
+SCORE_TOLERANCE = 1e-9
+# Characters dropped by normalise rather than treated as word breaks
+JOINERS = frozenset("'`\u2019\u00b4")
+# Marks the node that ends a key in a PrefixTrie, holding the key itself
+_END = ""
+
+
+class TrigramIndex:
+    """Inverted index from trigrams to the keys whose text contains them.
+
+    Each key's text is casefolded once, when added. A substring search only
+    needs to check the keys holding every trigram of the search string, found
+    by intersecting their sets smallest first. Searches shorter than a trigram
+    fall back to checking every key.
+    """
+
+    def __init__(self):
+        """Create an empty index."""
+        self._grams = {}
+        self._texts = {}
+
+    def __len__(self):
+        """Return the number of keys in the index."""
+        return len(self._texts)
+
+    def add(self, key, text):
+        """Index the given text under key, replacing any text it had before."""
+        self.discard(key)
+        folded = text.casefold()
+        self._texts[key] = folded
+        for gram in _trigrams(folded):
+            self._grams.setdefault(gram, set()).add(key)
+
+    def discard(self, key):
+        """Remove the key and its text from the index, if present."""
+        folded = self._texts.pop(key, None)
+        if folded is None:
+            return
+        for gram in _trigrams(folded):
+            keys = self._grams[gram]
+            keys.discard(key)
+            if not keys:
+                del self._grams[gram]
+
+    def search(self, text):
+        """Return the set of keys whose text contains the given text.
+
+        Matching is case-insensitive.
+        """
+        folded = text.casefold()
+        grams = _trigrams(folded)
+        if not grams:
+            return {key for key, value in self._texts.items() if folded in value}
+        try:
+            sets = sorted((self._grams[gram] for gram in grams), key=len)
+        except KeyError:
+            return set()
+        candidates = sets[0].intersection(*sets[1:])
+        if len(folded) == GRAM_LENGTH:
+            return candidates
+        return {key for key in candidates if folded in self._texts[key]}
+
+
+class FuzzyIndex:
+    """Inverted index of the trigrams of normalised text, for fuzzy matching.
+
+    Text is normalised and padded with a space at each end, so a word's first
+    and last letters count towards its trigrams. Each key's distinct trigrams
+    are worked out once, when added, and kept joined into a single string for
+    scoring. A search works out how many of its trigrams a key must share to
+    reach the threshold, so only walks the postings of its rarest trigrams to
+    find candidates, then checks each against the rest. Common trigrams held
+    by most keys are only looked up, never walked.
+    """
+
+    def __init__(self, keys=None, postings=None):
+        """Create the index.
+
+        Both arguments come from serialise, to restore an index without
+        normalising its text again.
+
+        Args:
+            keys: Dict of keys and their trigrams, joined into one string.
+            postings: Dict of trigrams and the keys holding them, joined by
+                newlines. Worked out from keys if not given.
+        """
+        self._keys = dict(keys or {})
+        if postings is None:
+            self._grams = {}
+            for key, grams in self._keys.items():
+                for gram in _split_grams(grams):
+                    self._grams.setdefault(gram, set()).add(key)
+        else:
+            self._grams = {gram: set(joined.split("\n")) for gram, joined in postings.items()}
+
+    def __len__(self):
+        """Return the number of keys in the index."""
+        return len(self._keys)
+
+    def add(self, key, text):
+        """Index the given text under key, replacing any text it had before."""
+        self.discard(key)
+        grams = _trigrams(f" {normalise(text)} ")
+        self._keys[key] = "".join(grams)
+        for gram in grams:
+            self._grams.setdefault(gram, set()).add(key)
+
+    def discard(self, key):
+        """Remove the key and its text from the index, if present."""
+        for gram in _split_grams(self._keys.pop(key, "")):
+            keys = self._grams[gram]
+            keys.discard(key)
+            if not keys:
+                del self._grams[gram]
+
+    def similar(self, text, threshold, partial=False):
+        """Return the keys whose text is similar to the given text.
+
+        Args:
+            text: Text to compare against.
+            threshold: Lowest score to return, between 0 and 1.
+            partial: If True, score keys by the share of the text's trigrams
+                they hold, so a close match for part of a key's text scores
+                highly. Otherwise score by the Dice coefficient of the two
+                trigram sets.
+
+        Returns:
+            Dict of the matching keys and their scores.
+        """
+        grams = _trigrams(f" {normalise(text)} ")
+        if not grams:
+            return {}
+        # Fewest shared trigrams that could score the threshold, taking the
+        # best case for Dice of a key holding nothing but shared trigrams
+        needed = threshold * len(grams) / (1 if partial else 2 - threshold)
+        needed = max(1, math.ceil(needed - SCORE_TOLERANCE))
+        if needed > len(grams):
+            return {}
+        postings = sorted((self._grams.get(gram, set()) for gram in grams), key=len)
+        # A key missing every one of the rarest postings can't share enough
+        rarest = len(grams) - needed + 1
+        shared = Counter()
+        for keys in postings[:rarest]:
+            shared.update(keys)
+        for keys in postings[rarest:]:
+            shared.update(keys.intersection(shared))
+        if partial:
+            scores = {key: count / len(grams) for key, count in shared.items()}
+        else:
+            scores = {
+                key: 2 * count / (len(grams) + len(self._keys[key]) // GRAM_LENGTH)
+                for key, count in shared.items()
+            }
+        return {key: score for key, score in scores.items() if score >= threshold}
+
+    def serialise(self):
+        """Express self in a format compatible with json.
+
+        Keys must not contain newlines.
+
+        Returns:
+            dict: Arguments to restore the index with
+        """
+        return {
+            "keys": dict(self._keys),
+            "postings": {gram: "\n".join(keys) for gram, keys in self._grams.items()},
+        }
+
+
+class PrefixTrie:
+    """Set of keys stored as a trie of nested dicts, one level per character.
+
+    Listing the keys with a given prefix walks down the prefix, then visits
+    only the subtree below it, so takes time in proportion to the prefix and
+    matching keys rather than the size of the set.
+    """
+
+    def __init__(self, keys=()):
+        """Create the trie.
+
+        Args:
+            keys: Iterable of keys to add.
+        """
+        self._root = {}
+        self._length = 0
+        for key in keys:
+            self.add(key)
+
+    def __contains__(self, key):
+        """Return presence of key in the trie."""
+        node = self._node(key)
+        return node is not None and _END in node
+
+    def __len__(self):
+        """Return the number of keys in the trie."""
+        return self._length
+
+    def add(self, key):
+        """Add a key to the trie, ignoring keys already present."""
+        node = self._root
+        for char in key:
+            node = node.setdefault(char, {})
+        if _END not in node:
+            node[_END] = key
+            self._length += 1
+
+    def discard(self, key):
+        """Remove a key from the trie if present, pruning emptied nodes."""
+        path, node = [], self._root
+        for char in key:
+            if char not in node:
+                return
+            path.append((node, char))
+            node = node[char]
+        if _END not in node:
+            return
+        del node[_END]
+        self._length -= 1
+        for parent, char in reversed(path):
+            if parent[char]:
+                break
+            del parent[char]
+
+    def with_prefix(self, prefix):
+        """Yield every key starting with the given prefix, in no set order."""
+        node = self._node(prefix)
+        stack = [] if node is None else [node]
+        while stack:
+            node = stack.pop()
+            for char, child in node.items():
+                if char == _END:
+                    yield child
+                else:
+                    stack.append(child)
+
+    def _node(self, prefix):
+        """Return the node reached by following prefix, or None."""
+        node = self._root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return None
+        return node
+
+
+def normalise(text):
+    """Reduce text to casefolded words without accents or punctuation.
+
+    Compatibility characters are decomposed and their accents dropped, so
+    e.g. "Beyoncé" and "BEYONCE" normalise the same. Apostrophes are removed
+    and any other character that isn't a letter or digit breaks words.
+    """
+    chars = []
+    for char in unicodedata.normalize("NFKD", text).casefold():
+        if char.isalnum():
+            chars.append(char)
+        elif char not in JOINERS and not unicodedata.combining(char):
+            chars.append(" ")
+    return " ".join("".join(chars).split())
+
+
+def _split_grams(text):
+    """Split a string of joined trigrams back into separate trigrams."""
+    return (text[i : i + GRAM_LENGTH] for i in range(0, len(text), GRAM_LENGTH))
+
+
+def _trigrams(text):
+    """Return the set of trigrams found in the given text."""
+    return {text[i : i + GRAM_LENGTH] for i in range(len(text) - GRAM_LENGTH + 1)}
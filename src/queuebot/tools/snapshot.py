@@ -0,0 +1,301 @@
+"""Compact binary snapshots of queue data.
+
+A snapshot holds the same JSON-compatible data as the queue's JSON file, in a
+smaller form that is faster to load once the queue's history grows long.
+
+Layout:
+    Header: b"QBS", a format version byte and a flags byte. Flag bit 0 means
+        the rest of the snapshot is zlib compressed.
+    Strings: count, an array of each string's length in characters, the
+        byte length of the text block, then every string joined into one
+        UTF-8 text block. Each distinct string is stored once and referred to
+        by its position in this table.
+    Value: the data itself, as type-tagged values. Lists of [str, str] pairs,
+        e.g. the queue's entries and picked history, are stored as a count
+        plus a flat array of string positions.
+
+Arrays hold unsigned 32-bit little-endian integers, other counts and
+integers are LEB128 varints.
+
+Functions:
+    dumps: Encode JSON-compatible data as a binary snapshot.
+    loads: Decode a binary snapshot back into JSON-compatible data.
+    convert: Convert a queue data file between JSON and snapshot formats.
+"""
+
+import json
+import struct
+import sys
+import zlib
+from array import array
+from itertools import accumulate, pairwise
+
+MAGIC = b"QBS"
+VERSION = 1
+FLAG_ZLIB = 1
+
+_NONE, _FALSE, _TRUE, _INT, _FLOAT, _STR, _LIST, _DICT, _PAIRS = range(9)
+_CONSTANTS = (None, False, True)
+_HEADER_SIZE = len(MAGIC) + 2
+_U32_SIZE = 4
+_U32 = next(code for code in "IL" if array(code).itemsize == _U32_SIZE)
+_DOUBLE = struct.Struct("<d")
+# Varint bytes carry 7 bits of the value, the top bit marks a following byte
+_VARINT_MORE = 0x80
+_VARINT_BITS = 0x7F
+
+
+def dumps(data, compress=True):
+    """Encode JSON-compatible data as a binary snapshot.
+
+    Args:
+        data: Data made of dicts, lists, tuples, strings, numbers, booleans
+            and None. Dict keys must be strings.
+        compress: Whether to zlib compress the snapshot.
+
+    Returns:
+        bytes holding the snapshot.
+
+    Raises:
+        TypeError: If the data holds a value that can't be encoded.
+    """
+    encoder = _Encoder()
+    encoder.value(data)
+    strings = list(encoder.strings)
+    text = "".join(strings).encode("utf-8", "surrogatepass")
+    body = bytearray()
+    _write_varint(body, len(strings))
+    body += _pack_u32(map(len, strings))
+    _write_varint(body, len(text))
+    body += text
+    body += encoder.out
+    if compress:
+        body = zlib.compress(body)
+    return MAGIC + bytes([VERSION, FLAG_ZLIB if compress else 0]) + body
+
+
+def loads(snapshot):
+    """Decode a binary snapshot back into JSON-compatible data.
+
+    Lists of pairs are returned as lists of tuples, which encode to the same
+    JSON as lists of lists.
+
+    Args:
+        snapshot: bytes as produced by dumps.
+
+    Returns:
+        The data held by the snapshot.
+
+    Raises:
+        ValueError: If the snapshot is malformed or from a newer version.
+    """
+    if snapshot[: len(MAGIC)] != MAGIC or len(snapshot) < _HEADER_SIZE:
+        raise ValueError("Not a queue snapshot")
+    version, flags = snapshot[len(MAGIC) : _HEADER_SIZE]
+    if version > VERSION:
+        raise ValueError(f"Unsupported snapshot version {version}")
+    body = snapshot[_HEADER_SIZE:]
+    try:
+        if flags & FLAG_ZLIB:
+            body = zlib.decompress(body)
+        return _Decoder(body).data
+    except (IndexError, KeyError, UnicodeDecodeError, struct.error, zlib.error) as exc:
+        raise ValueError(f"Corrupt snapshot: {exc}") from None
+
+
+def convert(src, dst, compress=True):
+    """Convert a queue data file between JSON and snapshot formats.
+
+    The direction is chosen by the source file's extension: ".json" files are
+    converted to snapshots, anything else is treated as a snapshot and
+    converted to indented JSON.
+
+    Args:
+        src: Path of the file to read.
+        dst: Path of the file to write.
+        compress: Whether a snapshot being written is zlib compressed.
+    """
+    if src.endswith(".json"):
+        with open(src, "r", encoding="utf-8") as file_:
+            data = json.loads(file_.read())
+        with open(dst, "wb") as file_:
+            file_.write(dumps(data, compress))
+    else:
+        with open(src, "rb") as file_:
+            data = loads(file_.read())
+        with open(dst, "w", encoding="utf-8") as file_:
+            file_.write(json.dumps(data, indent=4))
+
+
+class _Encoder:
+    """Encode values into a buffer, collecting their strings into a table."""
+
+    def __init__(self):
+        self.out = bytearray()
+        self.strings = {}
+
+    def string(self, string):
+        """Return the table position of a string, adding it if new."""
+        return self.strings.setdefault(string, len(self.strings))
+
+    def value(self, value):
+        """Append a type-tagged value to the buffer."""
+        out = self.out
+        if value is None:
+            out.append(_NONE)
+        elif isinstance(value, bool):
+            out.append(_TRUE if value else _FALSE)
+        elif isinstance(value, int):
+            out.append(_INT)
+            _write_varint(out, value << 1 if value >= 0 else (-value << 1) - 1)
+        elif isinstance(value, float):
+            out.append(_FLOAT)
+            out += _DOUBLE.pack(value)
+        elif isinstance(value, str):
+            out.append(_STR)
+            _write_varint(out, self.string(value))
+        elif isinstance(value, dict):
+            self.write_dict(value)
+        elif isinstance(value, (list, tuple)):
+            self.write_list(value)
+        else:
+            raise TypeError(f"Can't encode {type(value).__name__} in a snapshot")
+
+    def write_dict(self, value):
+        """Append a dict with string keys to the buffer."""
+        self.out.append(_DICT)
+        _write_varint(self.out, len(value))
+        for key, item in value.items():
+            if not isinstance(key, str):
+                raise TypeError(f"Snapshot keys must be str, not {type(key).__name__}")
+            _write_varint(self.out, self.string(key))
+            self.value(item)
+
+    def write_list(self, value):
+        """Append a list to the buffer, as an array if it only holds pairs."""
+        if value and all(_is_pair(item) for item in value):
+            self.out.append(_PAIRS)
+            _write_varint(self.out, len(value))
+            self.out += _pack_u32(self.string(string) for pair in value for string in pair)
+        else:
+            self.out.append(_LIST)
+            _write_varint(self.out, len(value))
+            for item in value:
+                self.value(item)
+
+
+class _Decoder:
+    """Decode the string table and value held in a snapshot body."""
+
+    def __init__(self, body):
+        self.body = body
+        self.pos = 0
+        lengths = self.u32_array(self.varint())
+        size = self.varint()
+        text = body[self.pos : self.pos + size].decode("utf-8", "surrogatepass")
+        self.pos += size
+        offsets = [0, *accumulate(lengths)]
+        if offsets[-1] != len(text):
+            raise IndexError("string table doesn't match its text")
+        self.strings = [text[start:end] for start, end in pairwise(offsets)]
+        self.data = self.value()
+
+    def varint(self):
+        """Read a varint."""
+        res = shift = 0
+        while True:
+            byte = self.body[self.pos]
+            self.pos += 1
+            res |= (byte & _VARINT_BITS) << shift
+            if byte < _VARINT_MORE:
+                return res
+            shift += 7
+
+    def u32_array(self, count):
+        """Read an array of count unsigned 32-bit integers."""
+        end = self.pos + _U32_SIZE * count
+        if end > len(self.body):
+            raise IndexError("array runs past the end of the snapshot")
+        res = array(_U32)
+        res.frombytes(self.body[self.pos : end])
+        if sys.byteorder == "big":
+            res.byteswap()
+        self.pos = end
+        return res
+
+    def value(self):
+        """Read a type-tagged value."""
+        tag = self.body[self.pos]
+        self.pos += 1
+        if tag < len(_CONSTANTS):
+            return _CONSTANTS[tag]
+        try:
+            reader = _READERS[tag]
+        except KeyError:
+            raise KeyError(f"unknown value tag {tag}") from None
+        return reader(self)
+
+    def read_int(self):
+        """Read a zigzag encoded integer."""
+        value = self.varint()
+        return -((value + 1) >> 1) if value & 1 else value >> 1
+
+    def read_float(self):
+        """Read a double precision float."""
+        (value,) = _DOUBLE.unpack_from(self.body, self.pos)
+        self.pos += _DOUBLE.size
+        return value
+
+    def read_str(self):
+        """Read a reference to a string in the table."""
+        return self.strings[self.varint()]
+
+    def read_list(self):
+        """Read a list of values."""
+        return [self.value() for _ in range(self.varint())]
+
+    def read_dict(self):
+        """Read a dict of string keys and values."""
+        return {self.strings[self.varint()]: self.value() for _ in range(self.varint())}
+
+    def read_pairs(self):
+        """Read an array of string pairs, as a list of tuples."""
+        strings = map(self.strings.__getitem__, self.u32_array(2 * self.varint()))
+        return list(zip(strings, strings))
+
+
+_READERS = {
+    _INT: _Decoder.read_int,
+    _FLOAT: _Decoder.read_float,
+    _STR: _Decoder.read_str,
+    _LIST: _Decoder.read_list,
+    _DICT: _Decoder.read_dict,
+    _PAIRS: _Decoder.read_pairs,
+}
+
+
+def _is_pair(item):
+    """Return True if item is a 2-element list or tuple of strings."""
+    if not isinstance(item, (list, tuple)):
+        return False
+    try:
+        key, value = item
+    except ValueError:
+        return False
+    return isinstance(key, str) and isinstance(value, str)
+
+
+def _pack_u32(values):
+    """Return the given integers packed as unsigned 32-bit little-endian."""
+    res = array(_U32, values)
+    if sys.byteorder == "big":
+        res.byteswap()
+    return res.tobytes()
+
+
+def _write_varint(out, value):
+    """Append a non-negative integer to out as a LEB128 varint."""
+    while value >= _VARINT_MORE:
+        out.append((value & _VARINT_BITS) | _VARINT_MORE)
+        value >>= 7
+    out.append(value)
@@ -2,9 +2,9 @@
 """Tools for managing a random or prioritised request queue.
 
 In Just Dance / random mode, the queue holds song choices, and picks users at
-random (prioritising users who haven't been picked before)
+random (prioritising users who have been picked the fewest times)
 In Jackbox / priority mode, the queue holds usernames, and picks users FIFO
-(also prioritising users who haven't been picked before)
+(also prioritising users who have been picked the fewest times)
 
 Classes:
     BaseMethods: Class containing methods to manipulate all types of queues
@@ -14,15 +14,19 @@ Classes:
     SongQueue: Class containing users / requests
 
 Functions:
+    mutating: Decorate a method that changes the queue, grouping its changes
+        into one undo step
     trunc: Take a string then truncate it to the specified length
 """
 
 import asyncio
 import contextlib
+import functools
+import os
 import time
 from asyncio import TimeoutError
-from json import dumps, loads
-from os import path
+from collections import Counter
+from json import loads
 from traceback import format_exc
 
 import aiohttp
@@ -30,13 +34,68 @@ from aiohttp.client_exceptions import ClientError
 from aiohttp.http_websocket import WebSocketError
 from aiohttp.streams import EofStream
 
-from .text import Paginate
+from .pick_history import (
+    HISTORY_WINDOW,
+    PickArchive,
+    PickHistory,
+    new_archive_id,
+    remove_stale_archives,
+)
+from .search_index import normalise
+from .storage import get_storage
+from .text import Listing, Paginate, fit_chars, page_of, to_bytes
 from .text import colourise as c
+from .tiered_list import PooledList, TieredList
 from .timed_list import TimedList
 from .tuple_list import TupleList
+from .undo_history import UndoHistory
 
 SINGLE_SONG_LENGTH = 200
 MULTI_SONG_LENGTH = 50  # (for lists)
+# Similarity scores above which songs are reported as duplicates, or offered
+# as close matches when !whichsong finds nothing. Duplicates must also share
+# the same words, as titles differing by a word or number score highly
+DUPLICATE_SIMILARITY = 0.8
+FUZZY_SIMILARITY = 0.5
+# Most matches a lookup lists, only the first page of which is ever sent
+MAX_LISTED_MATCHES = 50
+UNDO_LIMIT = 10
+# Parts of the queue replaced when it is cleared
+CLEARED_STATE = ("current", "currentusers", "picked", "pick_counts", "entries")
+
+# Methods of SongQueue that replay each change recorded with its storage
+REPLAY_METHODS = {
+    "add": "set_entry",
+    "remove": "remove_entry",
+    "pick": "record_pick",
+    "open": "set_open",
+    "mode": "set_mode",
+    "load": "replace_entries",
+    "clear": "clear",
+    "clearparty": "clear_party",
+    "archive": "archive_picks",
+}
+
+
+def mutating(method):
+    """Decorate a queue method that may change the queue's state.
+
+    The changes the method makes are collected as they're recorded, then kept
+    in the queue's undo history as one step.
+
+    Args:
+        method: Method of a BaseMethods subclass.
+
+    Returns:
+        Wrapped method.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args):
+        with self.parent.undo_step():
+            return method(self, *args)
+
+    return wrapper
 
 
 class BaseMethods:
@@ -56,21 +115,28 @@ class BaseMethods:
         """Return method that matches the given key."""
         return getattr(self, key, None)
 
+    @staticmethod
+    def new_entries(*tuples):
+        """Return a container for queue entries suited to this queue type."""
+        return TupleList(*tuples)
+
+    @mutating
     def close(self, *_args):
         """Close the queue, disallowing further entries."""
-        self.parent.isopen = False
+        self.parent.set_open(False)
         return "Queue is now closed"
 
+    @mutating
     def clear(self, *_args):
         """Remove all entries from the queue."""
-        self.parent.current, self.parent.currentusers = {}, TimedList(600)
-        self.parent.entries, self.parent.picked = TupleList(), TupleList()
+        self.parent.clear()
         return "Queue has been cleared"
 
+    @mutating
     def leave(self, sender, /, *_args):
         """Remove the sender's request from the queue."""
         if sender in self.parent:
-            del self.parent.entries[sender]
+            self.parent.remove_entry(sender)
             return f"{sender}, you have left the queue"
         return f"{sender}, you weren't in the queue"
 
@@ -78,18 +144,37 @@ class BaseMethods:
         """List all users who have a request in the queue."""
         if not self.parent.entries:
             return "Queue is empty"
-        msg = "List of users in the queue: "
-        for user, _song in self.parent.entries:
-            msg += f"{user}, "
-        return Paginate(msg[:-2], self.parent.msg_limit, ", ")[page]
+        return self.parent.listing("listusers", self._render_users)[page]
+
+    def _render_users(self):
+        """List the users in the queue, formatting only the pages asked for."""
+        users = [user for user, _song in self.parent.entries]
+        return Listing(
+            (len(to_bytes(user)) for user in users),
+            lambda start, stop: users[start:stop],
+            self.parent.msg_limit,
+            "List of users in the queue: ",
+        )
 
+    @mutating
     def removeuser(self, _, user="", /, *_args):
-        """Remove the specified user from the queue."""
+        """Remove the specified user from the queue.
+
+        The user can also be given by the start of their name, as long as
+        only one user in the queue has a name starting that way.
+        """
         try:
-            if user:
-                del self.parent.entries[user]
-            else:
+            user = user.replace("@", "")
+            if not user:
                 return "Please specify a username"
+            if user not in self.parent:
+                matches = self.parent.entries.with_prefix(user)
+                if len(matches) > 1:
+                    users = (match for _index, match, _entry in matches)
+                    return page_of(users, 1, self.parent.msg_limit, f'"{user}" could be: ')
+                if matches:
+                    user = matches[0][1]
+            self.parent.remove_entry(user)
         except AttributeError:
             return "Please specify a username"
         except ValueError:
@@ -97,6 +182,7 @@ class BaseMethods:
         else:
             return f"Removed {user} from the queue"
 
+    @mutating
     def queueconfirm(self, *_args):
         """Confirm a prior "testqueue" command.
 
@@ -111,12 +197,28 @@ class BaseMethods:
         max_age = 10
         with contextlib.suppress(AttributeError):
             if time.time() - self.parent.testdata[1] < max_age:
-                self.parent.entries = TupleList(*self.parent.testdata[0])
+                self.parent.replace_entries(self.parent.testdata[0])
                 del self.parent.testdata
                 return "Test data loaded into queue"
             del self.parent.testdata
         return None
 
+    def undo(self, *_args):
+        """Revert the last change made to the queue."""
+        try:
+            self.parent.undo()
+        except IndexError:
+            return "Nothing to undo"
+        return "Last queue change has been undone"
+
+    def redo(self, *_args):
+        """Reapply the last change that was undone."""
+        try:
+            self.parent.redo()
+        except IndexError:
+            return "Nothing to redo"
+        return "Last undone queue change has been redone"
+
     def testqueue(self, _, url=None, *_args):
         """Load testing data from testdata.json or an url provided as argument.
 
@@ -148,7 +250,7 @@ class BaseMethods:
                 self.parent.testdata = [loads(_get(url))]
             except ValueError as exc:
                 return f"Error parsing webpage response: {exc}"
-        elif path.exists("testdata.json"):
+        elif os.path.exists("testdata.json"):
             try:
                 with open("testdata.json", "r", encoding="utf-8") as file_:
                     self.parent.testdata = [loads(file_.read())]
@@ -185,9 +287,18 @@ class JDMethods(BaseMethods):
         ]
         self.parent.mode = "random"
 
+    def new_entries(self, *tuples):
+        """Return a container that can pick the least-picked users directly.
+
+        Entries stay in the order they were added, while users are also
+        bucketed by how many times they've been picked for random picks.
+        """
+        return PooledList(self.parent.tier_of, *tuples)
+
+    @mutating
     def jbqueue(self, *_args):
         """Change queue into Jackbox / priority mode."""
-        self.parent.mthds = JBMethods(self.parent)
+        self.parent.set_mode("priority")
         return "Queue is now in priority / user queue mode"
 
     @staticmethod
@@ -195,9 +306,10 @@ class JDMethods(BaseMethods):
         """Change queue into Just Dance / random song mode."""
         return "Queue is already in random song mode"
 
+    @mutating
     def open(self, *_args):
         """Open the queue, allowing new entries to be added."""
-        self.parent.isopen = True
+        self.parent.set_open(True)
         return "Random song queue is now open, type !sr <song name> to join!"
 
     def currententry(self, *_args):
@@ -209,11 +321,15 @@ class JDMethods(BaseMethods):
             )
         return "Nothing's been picked yet"
 
+    @mutating
     def addentry(self, sender, entry, emote_indices, /, *_args):
         """Add the sender's entry to the queue.
 
         Blank entries not allowed in this mode. If the sender already had an
-        entry in the queue, then change their entry to the new one.
+        entry in the queue, then change their entry to the new one. If another
+        user has already requested a near-identical song, say so. If the queue
+        has a song catalog, the entry is replaced by the catalog title it
+        matches, or refused with suggestions if it matches none.
 
         Args:
             sender: Username that sent the command.
@@ -238,19 +354,53 @@ class JDMethods(BaseMethods):
         if 0 in emote_indices:
             entry = " " + entry
 
-        old_entry = self.parent.entries[sender]
-        self.parent.entries[sender] = entry
+        if self.parent.catalog is not None:
+            title, suggestions = self.parent.catalog.match(entry)
+            if title is None:
+                msg = (
+                    f'Sorry {sender}, "{trunc(entry, SINGLE_SONG_LENGTH)}" isn\'t in the song list'
+                )
+                if suggestions:
+                    titles = (f'"{trunc(song, MULTI_SONG_LENGTH)}"' for song in suggestions)
+                    return page_of(titles, 1, self.parent.msg_limit, f"{msg}, did you mean: ")
+                return msg
+            entry = title
+
+        old_entry = self.parent.set_entry(sender, entry)
         if old_entry:
-            return (
+            msg = (
                 f'{sender}\'s song changed from "{trunc(old_entry, SINGLE_SONG_LENGTH // 2)}" '
                 f'to "{trunc(entry, SINGLE_SONG_LENGTH // 2)}"'
             )
-        return f'Added "{trunc(entry, SINGLE_SONG_LENGTH)}" to the queue for {sender}'
+        else:
+            msg = f'Added "{trunc(entry, SINGLE_SONG_LENGTH)}" to the queue for {sender}'
+        return msg + self.duplicate_of(sender, entry)
+
+    def duplicate_of(self, sender, entry):
+        """Return a note naming another request for the same song as the entry.
+
+        Songs count as the same if they score as similar and share the same
+        words once normalised, so differences in case, accents, punctuation
+        and word order are ignored, but "Song 1" and "Song 2" differ.
+
+        Returns:
+            String to append to a message, or "" if no other user has
+            requested the same song.
+        """
+        words = set(normalise(entry).split())
+        for _score, index, user, song in self.parent.entries.similar(entry, DUPLICATE_SIMILARITY):
+            if user.casefold() != sender.casefold() and set(normalise(song).split()) == words:
+                return (
+                    f' • {user} already requested "{trunc(song, MULTI_SONG_LENGTH)}" '
+                    f"at position {index + 1}"
+                )
+        return ""
 
+    @mutating
     def removeentry(self, _, index, /, *_args):
         """Remove the sender's entry from the queue."""
         try:
-            _user, entry = self.parent.entries.pop(int(index) - 1)
+            _user, entry = self.parent.pop_entry(int(index) - 1)
         except ValueError:
             return "Please specify a song number"
         except IndexError:
@@ -289,26 +439,39 @@ class JDMethods(BaseMethods):
         """List all entries currently in the queue."""
         if not self.parent.entries:
             return "Queue is empty"
-        msg = "List of songs in the queue: "
-        for i, (_user, song) in enumerate(self.parent.entries):
-            msg += f'{i + 1}. "{trunc(song, MULTI_SONG_LENGTH)}" • '
-        return Paginate(msg[:-3], self.parent.msg_limit, " • ")[page]
+        return self.parent.listing("listentries", self._render_entries)[page]
+
+    def _render_entries(self):
+        """List the songs in the queue, formatting only the pages asked for."""
+        songs = [trunc(song, MULTI_SONG_LENGTH) for _user, song in self.parent.entries]
+        return Listing(
+            (len(str(i)) + len('. ""') + len(to_bytes(song)) for i, song in enumerate(songs, 1)),
+            lambda start, stop: (f'{i + 1}. "{songs[i]}"' for i in range(start, stop)),
+            self.parent.msg_limit,
+            "List of songs in the queue: ",
+            " • ",
+        )
 
     def picked(self, _, page=1, /, *_args):
-        """List all entries that have been picked so far."""
+        """List the entries that have been picked so far, newest first."""
         if not self.parent.picked:
             return "Nothing's been played yet"
-        msg = "Songs already played: "
-        for _user, song in self.parent.picked:
-            msg += f'"{trunc(song, MULTI_SONG_LENGTH)}", '
-        return Paginate(msg[:-2], self.parent.msg_limit, ", ")[page]
+        pages = self.parent.listing("picked", dict)
+        if page not in pages:
+            songs = (
+                f'"{trunc(song, MULTI_SONG_LENGTH)}"'
+                for _user, song in self.parent.picked.newest()
+            )
+            pages[page] = page_of(songs, page, self.parent.msg_limit, "Songs already played: ")
+        return pages[page]
 
+    @mutating
     def pickentry(self, _, selection=0, /, *_args):
         """Pick an entry from the queue.
 
         If a number is specified, pick that entry directly. If no entry is
-        specified, pick an entry at random. Entries from users not in the
-        picked list are chosen first.
+        specified, pick an entry at random. Entries from users who have been
+        picked the fewest times are chosen first.
 
         Args:
             _: Disregard sender
@@ -321,11 +484,8 @@ class JDMethods(BaseMethods):
             message describing any issues with the specified selection.
         """
         try:
-            if selection:
-                user, song = self.parent.entries.pop(int(selection) - 1)
-                repeat_pick = user in self.parent.picked
-            else:
-                (user, song), repeat_pick = self.parent.entries.random(self.parent.picked)
+            index = int(selection) - 1 if selection else self.parent.entries.choose()
+            user, song = self.parent.pop_entry(index)
         except ValueError:
             return "Please specify a song number"
         except IndexError as exc:
@@ -333,8 +493,8 @@ class JDMethods(BaseMethods):
                 return "No such song"
             return "Queue is empty"
         else:
-            self.parent.current["user"], self.parent.current["entry"] = (user, song)
-            self.parent.picked.append((user, song))
+            repeat_pick = bool(self.parent.times_picked(user))
+            self.parent.record_pick(user, song)
             return (
                 f"{user} was picked{' again' if repeat_pick else ''}, "
                 f'their song was "{trunc(song, SINGLE_SONG_LENGTH)}"'
@@ -349,35 +509,71 @@ class JDMethods(BaseMethods):
             _args: Ignore extra positional args.
 
         Returns:
-            String containing the first username whose song contains the search
-            string.
+            String containing the user whose song contains the search string,
+            or the first matching songs in queue order if there's more than
+            one. If no song contains it, list the closest matches instead.
         """
-        for index, (user, song) in enumerate(self.parent):
-            if song.casefold().find(search.casefold()) != -1:
-                return (
-                    f'{user} requested "{trunc(song, SINGLE_SONG_LENGTH)}" at position {index + 1}'
-                )
-        return f'Song "{search}" not found in the queue'
+        if not search.strip():
+            return "Please specify a song"
+        matches = self.parent.entries.search(search)
+        if not matches:
+            return self.closest_entries(search)
+        if len(matches) == 1:
+            ((index, user, song),) = matches
+            return f'{user} requested "{trunc(song, SINGLE_SONG_LENGTH)}" at position {index + 1}'
+        songs = (
+            f'{index + 1}. "{trunc(song, MULTI_SONG_LENGTH)}" ({user})'
+            for index, user, song in matches[:MAX_LISTED_MATCHES]
+        )
+        return page_of(songs, 1, self.parent.msg_limit, f'Songs matching "{search}": ', " • ")
+
+    def closest_entries(self, search):
+        """List the songs most similar to a search that matched nothing."""
+        matches = self.parent.entries.similar(search, FUZZY_SIMILARITY, partial=True)
+        if not matches:
+            return f'Song "{search}" not found in the queue'
+        songs = (
+            f'{index + 1}. "{trunc(song, MULTI_SONG_LENGTH)}" ({user})'
+            for _score, index, user, song in matches[:MAX_LISTED_MATCHES]
+        )
+        return page_of(
+            songs, 1, self.parent.msg_limit, f'No exact match for "{search}", closest: ', " • "
+        )
 
     def lookupuser(self, _, search="", /, *_args):
         """Search queue for the given user.
 
+        A user with exactly the searched name is found first, then users whose
+        name starts with the search, then users whose name contains it.
+
         Args:
             _: Disregard sender
             search: User to look for.
             _args: Ignore extra positional args.
 
         Returns:
-            String containing the user's song, if found in the queue.
+            String containing the user's song, if found in the queue, or the
+            first matching users in queue order if there's more than one.
         """
-        search = search.replace("@", "")
-        for index, (user, song) in enumerate(self.parent):
-            if user.casefold().find(search.casefold()) != -1:
-                return (
-                    f'{user}\'s song is "{trunc(song, SINGLE_SONG_LENGTH)}", '
-                    f'at position {index + 1}"'
-                )
-        return f'"{search}" is not in the queue'
+        search = search.replace("@", "").strip()
+        if not search:
+            return "Please specify a username"
+        entries = self.parent.entries
+        matches = entries.with_prefix(search) or entries.search_keys(search)
+        exact = [match for match in matches if match[1].casefold() == search.casefold()]
+        matches = exact or matches
+        if not matches:
+            return f'"{search}" is not in the queue'
+        if len(matches) == 1:
+            ((index, user, song),) = matches
+            return (
+                f'{user}\'s song is "{trunc(song, SINGLE_SONG_LENGTH)}", at position {index + 1}"'
+            )
+        users = (
+            f'{index + 1}. {user}: "{trunc(song, MULTI_SONG_LENGTH)}"'
+            for index, user, song in matches[:MAX_LISTED_MATCHES]
+        )
+        return page_of(users, 1, self.parent.msg_limit, f'Users matching "{search}": ', " • ")
 
 
 class JBMethods(BaseMethods):
@@ -399,24 +595,35 @@ class JBMethods(BaseMethods):
         ]
         self.parent.mode = "priority"
 
+    def new_entries(self, *tuples):
+        """Return a container that keeps the least-picked users first.
+
+        Users join the queue behind everyone who has been picked fewer times
+        than them, without the queue needing to be reordered on each join.
+        """
+        return TieredList(self.parent.tier_of, *tuples)
+
     @staticmethod
     def jbqueue(*_args):
         """Change queue to Jackbox / priority mode."""
         return "Queue is already in priority / user queue mode"
 
+    @mutating
     def jdqueue(self, *_args):
         """Change queue to Just Dance / random mode."""
-        self.parent.mthds = JDMethods(self.parent)
+        self.parent.set_mode("random")
         return "Queue changed to random song mode"
 
+    @mutating
     def open(self, *_args):
         """Open the queue, allowing new entries to be added."""
-        self.parent.isopen = True
+        self.parent.set_open(True)
         return "Priority queue is now open, type !join to join!"
 
+    @mutating
     def clearparty(self, *_args):
         """Clear the current user party."""
-        self.parent.currentusers = TimedList(600)
+        self.parent.clear_party()
         return "Current user party has been cleared"
 
     def currententry(self, _, page=1, /, *_args):
@@ -439,11 +646,13 @@ class JBMethods(BaseMethods):
             return Paginate(res, self.parent.msg_limit, " • ")[page]
         return "No-one's been picked yet"
 
+    @mutating
     def addentry(self, sender, /, *_args):
         """Add the sender to the queue.
 
-        if the sender has already been picked, insert their entry after any new
-        users. The request itself is set to the sender's name.
+        if the sender has already been picked, insert their entry after any
+        users who have been picked fewer times. The request itself is set to
+        the sender's name.
 
         Args:
             sender: Username that sent the command.
@@ -461,17 +670,17 @@ class JBMethods(BaseMethods):
                 f"{self.parent.entries.index(sender) + 1}"
             )
         else:
-            self.parent.entries[sender] = sender
-            self.parent.entries = self.parent.entries.deprioritise(self.parent.picked)
+            self.parent.set_entry(sender, sender)
             msg = (
                 f"Added {sender} to the queue at position {self.parent.entries.index(sender) + 1}"
             )
         return msg
 
+    @mutating
     def removeentry(self, _, index, /, *_args):
         """Remove the user at the specified position from the queue."""
         try:
-            user, _entry = self.parent.entries.pop(int(index) - 1)
+            user, _entry = self.parent.pop_entry(int(index) - 1)
         except ValueError:
             return "Please specify an entry"
         except IndexError:
@@ -511,20 +720,30 @@ class JBMethods(BaseMethods):
         """List all users currently in the queue."""
         if not self.parent.entries:
             return "Queue is empty"
-        msg = "List of users in the queue: "
-        for i, (user, _entry) in enumerate(self.parent.entries):
-            msg += f"{i + 1}. {user} • "
-        return Paginate(msg[:-3], self.parent.msg_limit, " • ")[page]
+        return self.parent.listing("listentries", self._render_entries)[page]
+
+    def _render_entries(self):
+        """List the users in the queue in pick order, a page at a time."""
+        users = [user for user, _entry in self.parent.entries]
+        return Listing(
+            (len(str(i)) + len(". ") + len(to_bytes(user)) for i, user in enumerate(users, 1)),
+            lambda start, stop: (f"{i + 1}. {users[i]}" for i in range(start, stop)),
+            self.parent.msg_limit,
+            "List of users in the queue: ",
+            " • ",
+        )
 
     def picked(self, _, page=1, /, *_args):
-        """List all users that have been picked so far."""
+        """List the users that have been picked so far, newest first."""
         if not self.parent.picked:
             return "No-one's been picked yet"
-        msg = "Users already picked: "
-        for user, _entry in self.parent.picked:
-            msg += f"{user}, "
-        return Paginate(msg[:-2], self.parent.msg_limit, ", ")[page]
+        pages = self.parent.listing("picked", dict)
+        if page not in pages:
+            users = (user for user, _entry in self.parent.picked.newest())
+            pages[page] = page_of(users, page, self.parent.msg_limit, "Users already picked: ")
+        return pages[page]
 
+    @mutating
     def pickentry(self, _, selection=0, /, *_args):
         """Pick a user from the queue.
 
@@ -542,13 +761,8 @@ class JBMethods(BaseMethods):
                 describing any issues with the selection number.
         """
         try:
-            if selection:
-                user, entry = self.parent.entries.pop(int(selection) - 1)
-                repeat_pick = user in self.parent.picked
-            else:
-                (user, entry), repeat_pick = self.parent.entries.random(
-                    self.parent.picked, first=True
-                )
+            index = int(selection) - 1 if selection else self.parent.entries.choose(first=True)
+            user, entry = self.parent.pop_entry(index)
         except ValueError:
             return "Please specify a user number"
         except IndexError as exc:
@@ -556,9 +770,8 @@ class JBMethods(BaseMethods):
                 return "No such user"
             return "Queue is empty"
         else:
-            self.parent.current["user"], self.parent.current["entry"] = (user, entry)
-            self.parent.picked.append((user, entry))
-            self.parent.currentusers.append(user)
+            repeat_pick = bool(self.parent.times_picked(user))
+            self.parent.record_pick(user, entry, party=True)
             return (
                 f"Get ready to play, @{user}, you were picked from the "
                 f"queue{' again!' if repeat_pick else '!'}"
@@ -566,14 +779,34 @@ class JBMethods(BaseMethods):
 
 
 class SongQueue:
-    """Data relating to a song / request queue."""
+    """Data relating to a song / request queue.
+
+    Changes to the queue go through a small set of methods (set_entry,
+    remove_entry, record_pick etc.), each of which records the change with
+    the queue's storage. Storage backends that keep a journal can then replay
+    those changes on load, rather than rewriting the whole queue each time.
+
+    Each of those methods also records the call that would reverse it, e.g.
+    re-inserting a removed entry at its old position, or swapping back in the
+    containers that a clear replaced. Undoing a step makes those calls in
+    reverse order, which in turn record the calls needed to redo it. Nothing
+    is copied, so recording a change costs no more than making it.
+    """
 
-    def __init__(self, channel, *tuples):
+    def __init__(
+        self, channel, *tuples, storage=None, history_window=HISTORY_WINDOW, catalog=None
+    ):
         """Initialise the SongQueue.
 
         Args:
             channel: Name of the channel the queue refers to.
             tuples: Username, song pairs to insert into the queue
+            storage: Storage backend to load from and save to. Defaults to a
+                JSON file in the data/ folder.
+            history_window: Number of recent picks kept in memory, older ones
+                are archived to disk next to the storage.
+            catalog: Catalog of songs that random mode requests must match,
+                or None to accept any request.
         """
         self.channel = None
         self.isopen = None
@@ -581,9 +814,22 @@ class SongQueue:
         self.currentusers = None
         self.entries = None
         self.picked = None
+        self.pick_counts = None
         self.mode = None
         self.msg_limit = 499 - len(channel)
         self.mthds = None
+        # Undoing a pick takes it back out of the picks still in memory, so
+        # no more steps are kept than the history window leaves there
+        self.history = UndoHistory(min(UNDO_LIMIT, history_window))
+        self._changes = None
+        self.version = 0
+        self._saved_version = None
+        self.storage = storage or get_storage(channel)
+        self.history_window = history_window
+        self.catalog = catalog
+        self._replaying = False
+        self._checkpoint = False
+        self._listings = {}
         self.load(channel, *tuples)
 
     def __bool__(self):
@@ -606,6 +852,252 @@ class SongQueue:
         """Return length of the song queue."""
         return len(self.entries)
 
+    def listing(self, name, render):
+        """Return a listing of the queue, rendering it only when out of date.
+
+        Listings are kept until the queue's version or message limit changes,
+        so repeating a list command between changes costs a lookup.
+
+        Args:
+            name: Name to keep the listing under.
+            render: Callable returning the listing, e.g. a Listing.
+        """
+        key = (self.version, self.msg_limit)
+        cached = self._listings.get(name)
+        if cached is None or cached[0] != key:
+            cached = self._listings[name] = (key, render())
+        return cached[1]
+
+    def tier_of(self, user):
+        """Return the priority tier for the given user.
+
+        Users are tiered by the number of times they've been picked, so users
+        who have never been picked are in tier 0.
+        """
+        return self.times_picked(user)
+
+    def times_picked(self, user):
+        """Return the number of times the given user has been picked."""
+        return self.pick_counts[user.casefold()]
+
+    def set_entry(self, user, entry):
+        """Set the given user's entry, returning their previous one or None."""
+        if user in self.entries:
+            old = self.entries.record(user)
+            undo = ("set_entry", old.key, old.value)
+        else:
+            old, undo = None, ("remove_entry", user)
+        self.entries[user] = entry
+        self._record("add", user, entry, undo=undo)
+        return None if old is None else old.value
+
+    def insert_entry(self, index, user, entry):
+        """Put an entry back into the queue at the given position.
+
+        Only used to undo a removal, so isn't recorded with the storage.
+        """
+        self.entries.insert(index, (user, entry))
+        self._record(None, undo=("remove_entry", user))
+
+    def remove_entry(self, user):
+        """Remove the given user's entry from the queue.
+
+        Raises:
+            ValueError: If the user is not in the queue.
+        """
+        self.pop_entry(self.entries.index(user))
+
+    def pop_entry(self, index):
+        """Remove the entry at the given position and return it.
+
+        Raises:
+            IndexError: If there is no entry at that position.
+        """
+        if index < 0:
+            index += len(self.entries)
+        user, entry = self.entries.pop(index)
+        self._record("remove", user, undo=("insert_entry", index, user, entry))
+        return user, entry
+
+    def record_pick(self, user, entry, party=False):
+        """Record the given user and entry as the latest pick.
+
+        The picked entry should already have been taken out of the queue.
+
+        Args:
+            user: Username that was picked.
+            entry: Entry the user was picked for.
+            party: If True, also add the user to the current party.
+        """
+        undo = ("unpick", dict(self.current), party and self.currentusers.serialise())
+        self.current["user"], self.current["entry"] = (user, entry)
+        self.picked.append((user, entry))
+        self.pick_counts[user.casefold()] += 1
+        if party:
+            self.currentusers.append(user)
+        self._record("pick", user, entry, party, undo=undo)
+        if self.picked.full() and not self._replaying:
+            self.archive_picks()
+
+    def unpick(self, current, currentusers):
+        """Take back the latest pick.
+
+        Only used to undo a pick, so isn't recorded with the storage.
+
+        Args:
+            current: The current pick from before, as a dict.
+            currentusers: The serialised current party from before, or a
+                falsy value if the pick didn't add to the party.
+        """
+        user, entry = self.picked.pop()
+        self.pick_counts[user.casefold()] -= 1
+        if not self.pick_counts[user.casefold()]:
+            del self.pick_counts[user.casefold()]
+        self.current = dict(current)
+        if currentusers:
+            self.currentusers = TimedList(**currentusers)
+        self._record(None, undo=("record_pick", user, entry, bool(currentusers)))
+
+    def archive_picks(self, count=None):
+        """Move older picks out of memory and into the pick archive.
+
+        Args:
+            count: Number of picks held by the archive afterwards. Only given
+                when replaying, as the picks are then already archived and
+                just need dropping from memory.
+        """
+        if count is None:
+            count = self.picked.rotate()
+        else:
+            self.picked.trim(count)
+        self._record("archive", count)
+
+    def set_open(self, isopen):
+        """Open or close the queue."""
+        undo = ("set_open", self.isopen)
+        self.isopen = isopen
+        self._record("open", isopen, undo=undo)
+
+    def set_mode(self, mode):
+        """Switch the queue to "random" or "priority" mode, keeping entries."""
+        undo = ("reinstate", {"mode": self.mode, "entries": self.entries})
+        self.mthds = JDMethods(self) if mode == "random" else JBMethods(self)
+        self.entries = self.mthds.new_entries(*self.entries.records())
+        self._record("mode", mode, undo=undo)
+
+    def replace_entries(self, tuples):
+        """Replace every entry in the queue with the given pairs."""
+        undo = ("reinstate", {"entries": self.entries})
+        tuples = [tuple(pair) for pair in tuples]
+        self.entries = self.mthds.new_entries(*tuples)
+        self._record("load", tuples, undo=undo)
+
+    def clear(self, archive_id=None):
+        """Remove all entries, picks and the current party from the queue.
+
+        Args:
+            archive_id: Id of the archive to start the new pick history in.
+                Only given when replaying, so the same archive is used.
+        """
+        undo = ("reinstate", {name: self[name] for name in CLEARED_STATE})
+        self.current, self.currentusers = {}, TimedList(600)
+        self.picked = self._new_history(archive_id or new_archive_id())
+        self.pick_counts = Counter()
+        self.entries = self.mthds.new_entries()
+        self._record("clear", self.picked.archive.id, undo=undo)
+
+    def clear_party(self):
+        """Clear the current user party."""
+        undo = ("reinstate", {"currentusers": self.currentusers})
+        self.currentusers = TimedList(600)
+        self._record("clearparty", undo=undo)
+
+    def reinstate(self, state):
+        """Swap back in parts of the queue that a change replaced.
+
+        Only used to undo changes that replace whole parts of the queue, such
+        as clearing it. The parts replaced are no longer changed once they
+        have been swapped out, so are kept as they are rather than copied.
+        Isn't recorded with the storage.
+
+        Args:
+            state: Dict of attribute names and the values to give them. A
+                "mode" also switches the queue's methods to suit.
+        """
+        undo = ("reinstate", {name: self[name] for name in state})
+        for name, value in state.items():
+            setattr(self, name, value)
+        if "mode" in state:
+            self.mthds = JDMethods(self) if state["mode"] == "random" else JBMethods(self)
+        self._record(None, undo=undo)
+
+    def apply(self, change, *args):
+        """Apply a change recorded by one of the methods above.
+
+        Used to replay a journal, so the change isn't recorded again.
+
+        Args:
+            change: Name of the change, as passed to the storage.
+            args: Arguments the change was recorded with.
+        """
+        self._replaying = True
+        try:
+            if change == "pick":
+                user = args[0]
+                if user in self.entries:
+                    del self.entries[user]
+            getattr(self, REPLAY_METHODS[change])(*args)
+        finally:
+            self._replaying = False
+
+    @contextlib.contextmanager
+    def undo_step(self):
+        """Collect the changes made within the block as one undo step.
+
+        Yields:
+            List the reversing calls are collected in, in the order made.
+        """
+        self._changes = changes = []
+        try:
+            yield changes
+        finally:
+            self._changes = None
+            if changes:
+                self.history.record(changes)
+
+    def undo(self):
+        """Revert the last step recorded in the undo history.
+
+        Raises:
+            IndexError: If there is nothing to undo.
+        """
+        self.history.undo(self._revert)
+
+    def redo(self):
+        """Reapply the last step that was undone.
+
+        Raises:
+            IndexError: If there is nothing to redo.
+        """
+        self.history.redo(self._revert)
+
+    def _revert(self, changes):
+        """Make the reversing calls recorded for a step, newest first.
+
+        Args:
+            changes: List of (method name, *args) tuples.
+
+        Returns:
+            List of the calls that reverse this in turn.
+        """
+        self._changes = reverted = []
+        try:
+            for name, *args in reversed(changes):
+                getattr(self, name)(*args)
+        finally:
+            self._changes = None
+        return reverted
+
     def new(self, channel, *tuples):
         """Create a new SongQueue instead of loading existing data.
 
@@ -616,46 +1108,77 @@ class SongQueue:
         self.channel = channel
         self.isopen = True
         self.mthds = JDMethods(self)
-        self.current, self.entries, self.picked = {}, TupleList(*tuples), TupleList()
+        self.current, self.pick_counts = {}, Counter()
+        self.picked = self._new_history(new_archive_id())
+        self.entries = self.mthds.new_entries(*tuples)
         self.currentusers = TimedList(600)
+        self._checkpoint = True
         self.save()
 
+    def serialise(self):
+        """Return all queue data in a format compatible with json."""
+        return {
+            "channel": self.channel,
+            "isopen": self.isopen,
+            "current": dict(self.current),
+            "mode": self.mode,
+            "currentusers": self.currentusers.serialise(),
+            "entries": self.entries.serialise(),
+            "picked": self.picked.serialise(),
+            "archive": {"id": self.picked.archive.id, "base": self.picked.base},
+            "pick_counts": dict(self.pick_counts),
+        }
+
     def save(self):
-        """Dump all queue data to a file in the data/ folder."""
-        with open(f"data/{self.channel}.json", "w", encoding="utf-8") as file_:
-            res = {
-                "channel": self.channel,
-                "isopen": self.isopen,
-                "current": self.current,
-                "mode": self.mode,
-                "currentusers": self.currentusers.serialise(),
-                "entries": self.entries.serialise(),
-                "picked": self.picked.serialise(),
-            }
-            file_.write(dumps(res, indent=4))
+        """Save the queue data using the queue's storage.
+
+        Skipped if the queue's version hasn't moved since the last save, so
+        read-only commands don't cost a write.
+        """
+        if self.version == self._saved_version:
+            return
+        force, self._checkpoint = self._checkpoint, False
+        self.storage.save(self.serialise, force)
+        self._saved_version = self.version
+
+    def close(self):
+        """Save the queue data and release the queue's storage."""
+        self.save()
+        self.storage.close()
 
     def load(self, channel, *tuples):
-        """Load existing queue data from file.
+        """Load existing queue data using the queue's storage.
 
-        Create queue from scratch if data can't be loaded.
+        Any changes recorded since the data was last saved are replayed on top
+        of it. Create queue from scratch if data can't be loaded.
 
         Args:
             channel: Name of the channel the queue refers to.
             tuples: Username, song pairs to insert into the queue.
         """
         try:
-            with open(f"data/{channel}.json", "r", encoding="utf-8") as file_:
-                res = loads(file_.read())
-                self.channel = res["channel"]
-                self.isopen = res["isopen"]
-                self.current = res["current"]
-                self.currentusers = TimedList(**res["currentusers"])
-                self.entries = TupleList(*res["entries"])
-                self.picked = TupleList(*res["picked"])
-                if res["mode"] == "random":
-                    self.mthds = JDMethods(self)
-                else:
-                    self.mthds = JBMethods(self)
+            res = self.storage.load()
+            self.channel = res["channel"]
+            self.isopen = res["isopen"]
+            self.current = res["current"]
+            self.currentusers = TimedList(**res["currentusers"])
+            archive = res.get("archive") or {"id": new_archive_id(), "base": 0}
+            self.picked = self._new_history(archive["id"], res["picked"], archive["base"])
+            if "pick_counts" in res:
+                self.pick_counts = Counter(res["pick_counts"])
+            else:
+                self.pick_counts = Counter(user.casefold() for user, _entry in self.picked)
+            if res["mode"] == "random":
+                self.mthds = JDMethods(self)
+            else:
+                self.mthds = JBMethods(self)
+            self.entries = self.mthds.new_entries(*res["entries"])
+            for change in self.storage.replay():
+                with contextlib.suppress(LookupError, TypeError, ValueError):
+                    self.apply(*change)
+            self.picked.trim(len(self.picked.archive))
+            remove_stale_archives(self._archive_dir, self.channel, self.picked.archive.id)
+            self._saved_version = self.version
         except (OSError, ValueError, LookupError):
             print(
                 c(
@@ -665,6 +1188,38 @@ class SongQueue:
             )
             self.new(channel, *tuples)
 
+    @property
+    def _archive_dir(self):
+        """Return the directory pick archives are kept in."""
+        return os.path.dirname(self.storage.path)
+
+    def _new_history(self, archive_id, recent=(), base=0):
+        """Return a pick history using the archive with the given id."""
+        prefix = os.path.join(self._archive_dir, f"{self.channel}.picks.{archive_id}")
+        return PickHistory(PickArchive(prefix), self.history_window, recent, base)
+
+    def _record(self, change, *args, undo=None):
+        """Pass a change to the storage, unless it is being replayed.
+
+        Every change goes through here, so this is also where the queue's
+        version is bumped to mark it as needing a save.
+
+        Args:
+            change: Name of the change, or None for a change the storage
+                can't replay, in which case the next save writes out the
+                whole queue.
+            args: Arguments to replay the change with.
+            undo: (method name, *args) tuple of the call that reverses the
+                change, kept if an undo step is being collected.
+        """
+        self.version += 1
+        if self._changes is not None and undo is not None:
+            self._changes.append(undo)
+        if change is None:
+            self._checkpoint = True
+        elif not self._replaying:
+            self.storage.record(change, *args)
+
 
 def trunc(msg, length):
     """Take a string and truncate it to the specified length.
@@ -677,7 +1232,7 @@ def trunc(msg, length):
         Truncated string, ending in the ellipses character if truncation
         occurred.
     """
-    return msg if len(msg) <= length else msg[: length - 1] + "…"
+    return msg if len(msg) <= length else msg[: fit_chars(msg, length - 1)] + "…"
 
 
 def _get(url):
@@ -0,0 +1,651 @@
+"""Storage backends used to persist a SongQueue between runs.
+
+Classes:
+    JsonStorage: Rewrite the whole queue to a JSON file, in the background.
+    JournalStorage: Append one compact record per change to a journal, then
+        periodically compact the journal into a JSON snapshot.
+    SnapshotStorage: Rewrite the whole queue to a compact binary snapshot, in
+        the background.
+    SqliteStorage: Apply each change to the queue's rows in a SQLite database.
+    BackgroundWriter: Thread that writes the latest submitted data, merging
+        bursts of submissions into a single write.
+
+Functions:
+    get_storage: Return the storage backend for a channel by name.
+"""
+
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+from traceback import format_exc
+
+from . import snapshot
+from .text import colourise as col
+
+# Journal size in bytes that triggers compaction into a snapshot
+JOURNAL_THRESHOLD = 256 * 1024
+# Seconds a background write waits for further saves to merge with
+SAVE_INTERVAL = 1.0
+# Database shared by every channel using the sqlite storage
+SQLITE_PATH = "data/queuebot.db"
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS queues (
+    channel TEXT PRIMARY KEY,
+    isopen INTEGER NOT NULL,
+    mode TEXT NOT NULL,
+    current_user TEXT,
+    current_entry TEXT,
+    party_delay REAL NOT NULL,
+    party_time REAL NOT NULL,
+    archive_id TEXT,
+    history_base INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS entries (
+    channel TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    user TEXT NOT NULL,
+    folded TEXT NOT NULL,
+    entry TEXT NOT NULL,
+    PRIMARY KEY (channel, folded)
+);
+CREATE INDEX IF NOT EXISTS entries_position ON entries (channel, position);
+CREATE INDEX IF NOT EXISTS entries_entry ON entries (channel, entry);
+CREATE TABLE IF NOT EXISTS picks (
+    channel TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    user TEXT NOT NULL,
+    folded TEXT NOT NULL,
+    entry TEXT NOT NULL,
+    PRIMARY KEY (channel, seq)
+);
+CREATE INDEX IF NOT EXISTS picks_user ON picks (channel, folded);
+CREATE TABLE IF NOT EXISTS pick_counts (
+    channel TEXT NOT NULL,
+    folded TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (channel, folded)
+);
+CREATE TABLE IF NOT EXISTS party (
+    channel TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    user TEXT NOT NULL,
+    PRIMARY KEY (channel, seq)
+);
+"""
+
+
+class JsonStorage:
+    """Store the queue as a single human-editable JSON file.
+
+    Every save serialises and rewrites the whole queue, changes don't need to
+    be recorded individually. The queue data is captured when save is called,
+    but encoded and written by a BackgroundWriter, so callers don't wait on
+    the disk.
+    """
+
+    def __init__(self, path, interval=SAVE_INTERVAL):
+        """Create the storage.
+
+        Args:
+            path: Path of the JSON file to read and write.
+            interval: Seconds to wait after a save for further saves, which
+                are merged into the same write.
+        """
+        self.path = path
+        self.interval = interval
+        self._writer = None
+
+    def load(self):
+        """Return the queue data read from the JSON file.
+
+        Raises:
+            OSError: If the file can't be read.
+            ValueError: If the file isn't valid JSON.
+        """
+        with open(self.path, "r", encoding="utf-8") as file_:
+            return json.loads(file_.read())
+
+    def replay(self):
+        """Return the changes recorded since the data was last saved."""
+        return []
+
+    def record(self, *change):
+        """Record a single change to the queue, unused by this storage."""
+
+    def save(self, serialise, force=False):
+        """Queue the queue data to be written to the JSON file.
+
+        Args:
+            serialise: Callable returning the queue data to write.
+            force: Unused, every save writes the file.
+        """
+        if self._writer is None:
+            self._writer = BackgroundWriter(self._write, self.interval)
+        self._writer.submit(serialise())
+
+    def close(self):
+        """Write out any pending data and stop the background writer."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def _write(self, res):
+        """Write the given queue data to the JSON file."""
+        _write_atomic(self.path, json.dumps(res, indent=4))
+
+
+class JournalStorage(JsonStorage):
+    """Store the queue as a JSON snapshot plus a journal of later changes.
+
+    Each change is appended to the journal as one compact JSON line, so saving
+    after a command doesn't rewrite the whole queue. Once the journal grows
+    past the threshold, the queue is written out as a new snapshot in a
+    background thread and the old journal is discarded.
+
+    Journals are numbered by generation. A snapshot records the generation of
+    the journal started alongside it, so on load only journals from that
+    generation onwards are replayed.
+    """
+
+    def __init__(self, path, threshold=JOURNAL_THRESHOLD):
+        """Create the storage.
+
+        Args:
+            path: Path of the JSON snapshot file. Journals are stored next to
+                it, named "<name>.<generation>.journal".
+            threshold: Journal size in bytes that triggers compaction.
+        """
+        super().__init__(path)
+        self.threshold = threshold
+        self.generation = 0
+        self._stem = os.path.splitext(path)[0]
+        self._journal = None
+        self._size = 0
+        self._compactor = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Return the queue data from the snapshot file."""
+        res = super().load()
+        self.generation = res.get("generation", 0)
+        return res
+
+    def replay(self):
+        """Yield the changes recorded in the journals since the snapshot.
+
+        A partially written final line, e.g. from a crash, ends the replay.
+        """
+        generations = sorted(gen for gen in self._journal_generations() if gen >= self.generation)
+        for generation in generations:
+            with open(self._journal_path(generation), "r", encoding="utf-8") as file_:
+                for line in file_:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        break
+            self.generation = generation
+
+    def record(self, *change):
+        """Append a change to the current journal."""
+        line = json.dumps(change, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._journal is None:
+                self._journal = open(self._journal_path(self.generation), "a", encoding="utf-8")
+                self._size = self._journal.tell()
+            self._journal.write(line)
+            self._journal.flush()
+            self._size += len(line)
+
+    def save(self, serialise, force=False):
+        """Compact the journal into a snapshot if needed.
+
+        Args:
+            serialise: Callable returning the queue data to write. Only called
+                when a snapshot is due.
+            force: Write a snapshot even if the journal is still small.
+        """
+        if not (force or self._size > self.threshold or not os.path.exists(self.path)):
+            return
+        res = serialise()
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            self._size = 0
+            self.generation = max([self.generation, *self._journal_generations()]) + 1
+            res["generation"] = self.generation
+        if self._compactor is not None:
+            self._compactor.join()
+        self._compactor = threading.Thread(target=self._compact, args=(res,))
+        self._compactor.start()
+
+    def close(self):
+        """Wait for any compaction to finish, then close the journal."""
+        super().close()
+        if self._compactor is not None:
+            self._compactor.join()
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+    def _compact(self, res):
+        """Write a snapshot, then delete the journals it supersedes."""
+        _write_atomic(self.path, json.dumps(res, indent=4))
+        for generation in self._journal_generations():
+            if generation < res["generation"]:
+                os.remove(self._journal_path(generation))
+
+    def _journal_path(self, generation):
+        """Return the path of the journal for the given generation."""
+        return f"{self._stem}.{generation}.journal"
+
+    def _journal_generations(self):
+        """Return the generations of the journals present on disk."""
+        res = []
+        for name in glob.glob(glob.escape(self._stem) + ".*.journal"):
+            generation = name[len(self._stem) + 1 : -len(".journal")]
+            if generation.isdigit():
+                res.append(int(generation))
+        return res
+
+
+class SnapshotStorage(JsonStorage):
+    """Store the queue as a compact binary snapshot.
+
+    Uses the format from the snapshot module, which is smaller and quicker to
+    load than indented JSON once the picked history grows long. If there is no
+    snapshot yet, the queue is loaded from the JSON file alongside it instead,
+    so existing queues carry over when switching storage.
+    """
+
+    def __init__(self, path, interval=SAVE_INTERVAL, compress=True):
+        """Create the storage.
+
+        Args:
+            path: Path of the snapshot file to read and write.
+            interval: Seconds to wait after a save for further saves, which
+                are merged into the same write.
+            compress: Whether to zlib compress the snapshot.
+        """
+        super().__init__(path, interval)
+        self.compress = compress
+        self.json_path = os.path.splitext(path)[0] + ".json"
+
+    def load(self):
+        """Return the queue data read from the snapshot, or the JSON file.
+
+        Raises:
+            OSError: If neither file can be read.
+            ValueError: If the file read is malformed.
+        """
+        try:
+            with open(self.path, "rb") as file_:
+                return snapshot.loads(file_.read())
+        except FileNotFoundError:
+            with open(self.json_path, "r", encoding="utf-8") as file_:
+                return json.loads(file_.read())
+
+    def _write(self, res):
+        """Write the given queue data to the snapshot file."""
+        _write_atomic(self.path, snapshot.dumps(res, self.compress))
+
+
+class SqliteStorage:
+    """Store queues in a SQLite database, one row per entry and pick.
+
+    Each recorded change is applied straight to the database as a few single
+    row statements, so the cost of saving doesn't grow with the size of the
+    queue or its history. Several channels can share one database file, their
+    rows are keyed by channel name.
+
+    Changes that reorder the whole queue (switching mode) and forced saves
+    rewrite the channel's rows from the queue data instead.
+    """
+
+    def __init__(self, path, channel):
+        """Open the database, creating its tables if needed.
+
+        Args:
+            path: Path of the database file.
+            channel: Name of the channel whose queue is stored.
+        """
+        self.path = path
+        self.channel = channel
+        self._rewrite = False
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._db:
+            self._db.executescript(SQLITE_SCHEMA)
+
+    def load(self):
+        """Return the queue data for the channel read from the database.
+
+        Raises:
+            LookupError: If the database holds no queue for the channel.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT isopen, mode, current_user, current_entry, party_delay, party_time, "
+                "archive_id, history_base FROM queues WHERE channel = ?",
+                (self.channel,),
+            ).fetchone()
+            if row is None:
+                raise LookupError(f"No saved queue for {self.channel}")
+            isopen, mode, user, entry, delay, written, archive_id, base = row
+            return {
+                "channel": self.channel,
+                "isopen": bool(isopen),
+                "current": {} if user is None else {"user": user, "entry": entry},
+                "mode": mode,
+                "currentusers": {
+                    "data": self._column("SELECT user FROM party WHERE channel = ? ORDER BY seq"),
+                    "delay": delay,
+                    "time": written,
+                },
+                "entries": self._rows(
+                    "SELECT user, entry FROM entries WHERE channel = ? ORDER BY position"
+                ),
+                "picked": self._rows(
+                    "SELECT user, entry FROM picks WHERE channel = ? ORDER BY seq"
+                ),
+                "archive": archive_id and {"id": archive_id, "base": base},
+                "pick_counts": dict(
+                    self._rows("SELECT folded, count FROM pick_counts WHERE channel = ?")
+                ),
+            }
+
+    def replay(self):
+        """Return no changes, every change is already in the database."""
+        return []
+
+    def record(self, change, *args):
+        """Apply a single change to the channel's rows.
+
+        Args:
+            change: Name of the change, as recorded by the SongQueue.
+            args: Arguments the change was recorded with.
+        """
+        if change == "mode":
+            self._rewrite = True
+        with self._lock, self._db:
+            getattr(self, f"_apply_{change}")(*args)
+
+    def save(self, serialise, force=False):
+        """Rewrite the channel's rows if needed.
+
+        Args:
+            serialise: Callable returning the queue data to write. Only called
+                when a rewrite is due.
+            force: Rewrite the rows even if every change has been applied.
+        """
+        if not (force or self._rewrite):
+            return
+        res = serialise()
+        self._rewrite = False
+        with self._lock, self._db:
+            self._apply_clear()
+            self._db.execute(
+                "INSERT OR REPLACE INTO queues VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self.channel,
+                    res["isopen"],
+                    res["mode"],
+                    res["current"].get("user"),
+                    res["current"].get("entry"),
+                    res["currentusers"]["delay"],
+                    res["currentusers"]["time"],
+                    res["archive"]["id"],
+                    res["archive"]["base"],
+                ),
+            )
+            self._insert_entries(res["entries"])
+            self._db.executemany(
+                "INSERT INTO picks VALUES (?, ?, ?, ?, ?)",
+                (
+                    (self.channel, seq, user, user.casefold(), entry)
+                    for seq, (user, entry) in enumerate(res["picked"], res["archive"]["base"])
+                ),
+            )
+            self._db.executemany(
+                "INSERT INTO pick_counts VALUES (?, ?, ?)",
+                ((self.channel, user, count) for user, count in res["pick_counts"].items()),
+            )
+            self._db.executemany(
+                "INSERT INTO party VALUES (?, ?, ?)",
+                (
+                    (self.channel, seq, user)
+                    for seq, user in enumerate(res["currentusers"]["data"])
+                ),
+            )
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._db.close()
+
+    def _column(self, query):
+        """Return the first column of a query on the channel's rows."""
+        return [row[0] for row in self._db.execute(query, (self.channel,))]
+
+    def _rows(self, query):
+        """Return the rows of a query on the channel's rows, as tuples."""
+        return self._db.execute(query, (self.channel,)).fetchall()
+
+    def _next(self, table, column, default=0):
+        """Return the next free position or sequence number in a table."""
+        (res,) = self._db.execute(
+            f"SELECT COALESCE(MAX({column}) + 1, ?) FROM {table} WHERE channel = ?",
+            (default, self.channel),
+        ).fetchone()
+        return res
+
+    def _insert_entries(self, tuples):
+        """Append the given user, entry pairs to the channel's entries."""
+        start = self._next("entries", "position")
+        self._db.executemany(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+            (
+                (self.channel, start + position, user, user.casefold(), entry)
+                for position, (user, entry) in enumerate(tuples)
+            ),
+        )
+
+    def _apply_add(self, user, entry):
+        """Set a user's entry, keeping their position if already queued."""
+        updated = self._db.execute(
+            "UPDATE entries SET user = ?, entry = ? WHERE channel = ? AND folded = ?",
+            (user, entry, self.channel, user.casefold()),
+        )
+        if not updated.rowcount:
+            self._insert_entries([(user, entry)])
+
+    def _apply_remove(self, user):
+        """Remove a user's entry."""
+        self._db.execute(
+            "DELETE FROM entries WHERE channel = ? AND folded = ?",
+            (self.channel, user.casefold()),
+        )
+
+    def _apply_pick(self, user, entry, party):
+        """Record a pick, removing the picked user's entry."""
+        self._apply_remove(user)
+        (base,) = self._db.execute(
+            "SELECT history_base FROM queues WHERE channel = ?", (self.channel,)
+        ).fetchone()
+        self._db.execute(
+            "INSERT INTO picks VALUES (?, ?, ?, ?, ?)",
+            (self.channel, self._next("picks", "seq", base), user, user.casefold(), entry),
+        )
+        self._db.execute(
+            "INSERT INTO pick_counts VALUES (?, ?, 1) "
+            "ON CONFLICT (channel, folded) DO UPDATE SET count = count + 1",
+            (self.channel, user.casefold()),
+        )
+        self._db.execute(
+            "UPDATE queues SET current_user = ?, current_entry = ? WHERE channel = ?",
+            (user, entry, self.channel),
+        )
+        if party:
+            self._db.execute(
+                "INSERT INTO party VALUES (?, ?, ?)",
+                (self.channel, self._next("party", "seq"), user),
+            )
+            self._touch_party()
+
+    def _apply_open(self, isopen):
+        """Open or close the queue."""
+        self._db.execute("UPDATE queues SET isopen = ? WHERE channel = ?", (isopen, self.channel))
+
+    def _apply_mode(self, mode):
+        """Switch the queue's mode, the entries are rewritten on save."""
+        self._db.execute("UPDATE queues SET mode = ? WHERE channel = ?", (mode, self.channel))
+
+    def _apply_load(self, tuples):
+        """Replace every entry in the queue."""
+        self._db.execute("DELETE FROM entries WHERE channel = ?", (self.channel,))
+        self._insert_entries(tuples)
+
+    def _apply_clear(self, archive_id=None):
+        """Remove all entries, picks and the current party."""
+        for table in ("entries", "picks", "pick_counts", "party"):
+            self._db.execute(f"DELETE FROM {table} WHERE channel = ?", (self.channel,))
+        self._db.execute(
+            "UPDATE queues SET current_user = NULL, current_entry = NULL, archive_id = ?, "
+            "history_base = 0 WHERE channel = ?",
+            (archive_id, self.channel),
+        )
+        self._touch_party()
+
+    def _apply_archive(self, count):
+        """Drop the picks that have been moved to the pick archive."""
+        self._db.execute("DELETE FROM picks WHERE channel = ? AND seq < ?", (self.channel, count))
+        self._db.execute(
+            "UPDATE queues SET history_base = ? WHERE channel = ?", (count, self.channel)
+        )
+
+    def _apply_clearparty(self):
+        """Clear the current user party."""
+        self._db.execute("DELETE FROM party WHERE channel = ?", (self.channel,))
+        self._touch_party()
+
+    def _touch_party(self):
+        """Restart the current party's expiry delay."""
+        self._db.execute(
+            "UPDATE queues SET party_time = ? WHERE channel = ?", (time.time(), self.channel)
+        )
+
+
+class BackgroundWriter:
+    """Thread that writes the latest data submitted to it.
+
+    Data is handed over with submit and written by a daemon thread. After the
+    first submission of a burst, the thread waits for the interval to pass and
+    writes only the most recent data submitted in that time. A write that
+    fails is logged and dropped, leaving the thread to carry on.
+    """
+
+    def __init__(self, write, interval=SAVE_INTERVAL):
+        """Create the writer and start its thread.
+
+        Args:
+            write: Callable taking the submitted data and writing it out.
+            interval: Seconds to wait for further submissions before writing.
+        """
+        self.write = write
+        self.interval = interval
+        self._pending = None
+        self._writing = False
+        self._flushing = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, data):
+        """Queue data to be written, replacing any data still waiting."""
+        with self._cond:
+            self._pending = data
+            self._cond.notify_all()
+
+    def flush(self):
+        """Write any waiting data now, returning once it's on disk."""
+        with self._cond:
+            self._flushing = True
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: self._pending is None and not self._writing)
+            self._flushing = False
+
+    def close(self):
+        """Flush any waiting data, then stop the thread."""
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        """Wait for submissions and write them out, until closed."""
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or self._closed)
+                if self._pending is None:
+                    return
+                deadline = time.monotonic() + self.interval
+                while not self._flushing and (remaining := deadline - time.monotonic()) > 0:
+                    self._cond.wait(remaining)
+                data, self._pending = self._pending, None
+                self._writing = True
+            try:
+                self.write(data)
+            except Exception:
+                # Keep the thread alive, or flush and close would wait forever
+                print(col(f"\n{format_exc()}\nFailed to save queue", "GREY"))
+            finally:
+                with self._cond:
+                    self._writing = False
+                    self._cond.notify_all()
+
+
+def get_storage(channel, kind="json", interval=SAVE_INTERVAL):
+    """Return a storage backend for the given channel.
+
+    Args:
+        channel: Name of the channel whose queue is stored.
+        kind: Name of the storage backend, "json", "journal", "snapshot" or
+            "sqlite".
+        interval: Seconds a JSON or snapshot save waits to merge with further
+            saves.
+
+    Returns:
+        Storage backend object storing its data in the data/ folder.
+
+    Raises:
+        ValueError: If the storage backend name is unknown.
+    """
+    path = f"data/{channel}.json"
+    if kind.casefold() == "json":
+        return JsonStorage(path, interval)
+    if kind.casefold() == "journal":
+        return JournalStorage(path)
+    if kind.casefold() == "snapshot":
+        return SnapshotStorage(f"data/{channel}.qbs", interval)
+    if kind.casefold() == "sqlite":
+        return SqliteStorage(SQLITE_PATH, channel)
+    raise ValueError(f'Unknown storage "{kind}"')
+
+
+def _write_atomic(path, data):
+    """Write text or bytes to a file via a temporary file, in one step."""
+    temp_path = f"{path}.tmp"
+    mode = "wb" if isinstance(data, bytes) else "w"
+    with open(temp_path, mode, encoding=None if mode == "wb" else "utf-8") as file_:
+        file_.write(data)
+        file_.flush()
+        os.fsync(file_.fileno())
+    os.replace(temp_path, path)
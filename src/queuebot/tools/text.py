@@ -4,14 +4,40 @@ Classes:
     Paginate: Takes a string and returns a list of strings split to the
         specified length. Optionally attempts to cut at the specified separator
         where possible.
+    Listing: Pages of a list of items of known widths, formatting only the
+        pages asked for.
 
 Functions:
+    fit_bytes: Return the last character boundary within a byte budget.
+    fit_chars: Return the last character boundary within a character budget.
+    page_of: Return one page of a lazily produced sequence of strings.
     trim_bytes: Take a string and splits it to the specified number of bytes.
     colourise: Take a string and a colour, returns the string with ANSI colour
         codes around it.
 """
 
+import unicodedata
+from bisect import bisect_right
+from collections import deque
+
 ENCODING = "UTF-8"
+# UTF-8 encoding of the ellipsis character, marking a page cut mid-word
+ELLIPSIS = "\u2026".encode(ENCODING)
+# Bytes that continue a UTF-8 character rather than starting one
+_CONTINUATION = range(0x80, 0xC0)
+# Zero width joiner, gluing the characters either side of it together
+_JOINER = "\u200d"
+# Characters other than combining marks that extend the character before them,
+# the zero width joiner and the emoji skin tone modifiers
+_EXTENDERS = frozenset(_JOINER + "".join(map(chr, range(0x1F3FB, 0x1F400))))
+# Unicode categories of combining marks
+_MARKS = frozenset(("Mn", "Mc", "Me"))
+# Most joined characters stepped back over to keep a cluster whole, as in
+# Unicode's stream-safe text format. Longer runs, like zalgo text, are cut
+# between characters instead
+MAX_JOINED = 30
+# Highest page number page_of leaves room for in its "(page i/n)" suffix
+PAGE_NUMBER_LIMIT = 99999
 
 
 class Paginate:
@@ -19,6 +45,10 @@ class Paginate:
 
     Supports indexing to return the given page number,
     or iterating through all pages.
+
+    Only the cut points are worked out up front. Each page's text is decoded
+    when it is asked for, so a Paginate kept around for repeated requests
+    costs one page's worth of work per request.
     """
 
     def __init__(self, data, length, sep=""):
@@ -31,8 +61,8 @@ class Paginate:
                 will attempt to break near where these strings appear.
         """
         self.sep = to_bytes(sep)
-        bytes_, self.max_length = self._process_data(data, length)
-        self.data = [to_string(page) for page in bytes_]
+        self._bytes = to_bytes(data)
+        self._pages, self.max_length = self._process_data(self._bytes, length)
 
     def __getitem__(self, page_num=0):
         """Redirect subscript accesses to the paginated data.
@@ -46,84 +76,292 @@ class Paginate:
         try:
             page_num = int(page_num)
             page_number = page_num - 1 if page_num > 0 else page_num
-            res = self.data[page_number]
+            res = self._page(page_number)
         except (LookupError, ValueError):
-            res = self.data[0]
+            res = self._page(0)
         return res
 
     def __str__(self):
         """Return the first page of data, formatted as string."""
-        return self.data[0]
+        return self._page(0)
 
     def __iter__(self):
         """Iterate over the data pages."""
-        return iter(self.data)
-
-    @staticmethod
-    def _add_suffixes(data):
-        """Append page suffixes to each element of the given sequence."""
-        length = len(data)
-        if length <= 1:
-            return data
-        return [
-            to_bytes(f"{to_string(string)} (page {index + 1}/{length})")
-            for index, string in enumerate(data)
-        ]
-
-    def _split_bytes(self, data, max_length):
-        """Process the given data into groupings of bytes.
+        return (self._page(index) for index in range(len(self._pages)))
+
+    def __len__(self):
+        """Return the number of pages."""
+        return len(self._pages)
+
+    @property
+    def data(self):
+        """List of the strings held in each page."""
+        return list(self)
+
+    def _page(self, index):
+        """Return the text of the page at the given list index."""
+        start, end, ellipsis, suffix = self._pages[index]
+        return to_string(self._bytes[start:end] + ELLIPSIS * ellipsis) + suffix
+
+    def _cuts(self, data, seps, length):
+        """Work out where the data is cut into pages of the given length.
+
+        A page ends at the last separator that fits within the length, as long
+        as the length doesn't fall inside a character. Otherwise the page is
+        cut at the last character boundary that leaves room for an ellipsis.
 
         Args:
-            data: String of bytes.
-            max_length: Maximum length that the byte strings are split into.
+            data: Input bytes.
+            seps: Sorted offsets of every occurrence of the separator.
+            length: Maximum byte length of each page, before its suffix.
 
         Returns:
-            List of byte strings.
+            List of (start, end, ellipsis) tuples, one for each page, or None
+            if the data can't be cut at this length.
         """
-        if len(data) <= max_length:
-            return [data]
-        spacing = len(self.sep)
-        prefix = data[:max_length]
-        try:
-            cut = prefix.rindex(self.sep)
-            _ = str(prefix, encoding="utf-8")
-        except ValueError:
-            current_length = max_length
-            while current_length:
-                try:
-                    # byte representation of ellipses char
-                    front = data[: current_length - 3] + b"\xe2\x80\xa6"
-                    back = data[current_length - 3 :]
-                    _ = [str(e, encoding="utf-8") for e in (front, back)]
-                except ValueError:
-                    current_length -= 1
-                else:
-                    return [front, *self._split_bytes(back, max_length)]
-        else:
-            return [data[:cut], *self._split_bytes(data[cut + spacing :], max_length)]
+        sep_length = len(self.sep)
+        cuts, pos, size = [], 0, len(data)
+        while size - pos > length:
+            end = pos + length
+            if fit_bytes(data, end, pos) == end:
+                if not sep_length:
+                    cuts.append((pos, end, False))
+                    pos = end
+                    continue
+                found = bisect_right(seps, end - sep_length) - 1
+                if found >= 0 and seps[found] >= pos:
+                    cuts.append((pos, seps[found], False))
+                    pos = seps[found] + sep_length
+                    continue
+            cut = fit_bytes(data, end - len(ELLIPSIS), pos)
+            if cut <= pos:
+                return None
+            cuts.append((pos, cut, True))
+            pos = cut
+        cuts.append((pos, size, False))
+        return cuts
 
     def _process_data(self, data, max_length):
         """Take a given string and split it into smaller pages.
 
+        Page lengths are tried from max_length downwards, keeping the first
+        at which every page still fits once its "(page i/n)" suffix is added.
+        Separator positions are found once up front, so each attempt only
+        steps between cut points.
+
         Args:
-            data: Input string to split up.
+            data: Input bytes to split up.
             max_length: Maximum byte length of each page.
 
         Returns:
-            List of byte strings representing the pages. Can be a list
-            containing a single empty string if there was a problem splitting
-            the input string.
+            2-tuple of the pages, as (start, end, ellipsis, suffix) tuples,
+            and the page length used before suffixes. Holds a single empty
+            page if the data couldn't be split.
         """
-        data = to_bytes(data)
+        seps = _find_all(data, self.sep) if self.sep else []
         for length in range(max_length, 1, -1):
-            try:
-                output = self._split_bytes(data, length)
-            except RecursionError:
-                output = [b""]
-            output = self._add_suffixes(output)
-            if all(len(string) < max_length for string in output):
-                return output, length
-        return [b""], 1
+            cuts = self._cuts(data, seps, length)
+            if cuts is None:
+                break
+            count = len(cuts)
+            suffixes = [f" (page {index}/{count})" for index in range(1, count + 1)]
+            if count == 1:
+                suffixes = [""]
+            if all(
+                end - start + len(ELLIPSIS) * ellipsis + len(suffix) < max_length
+                for (start, end, ellipsis), suffix in zip(cuts, suffixes)
+            ):
+                return [(*cut, suffix) for cut, suffix in zip(cuts, suffixes)], length
+        return [(0, 0, False, "")], 1
+
+
+class Listing:
+    """Pages of a list of items, formatting a page only once it is asked for.
+
+    Supports indexing with a page number the same way as Paginate. The byte
+    width of each item is given up front, which is all that's needed to work
+    out which items fall on each page, so asking for one page of a long list
+    only formats the items on that page. Pages start with the prefix on the
+    first page only, keep items whole and end with a "(page i/n)" suffix
+    when there's more than one.
+    """
+
+    def __init__(self, widths, render, length, prefix="", sep=", "):
+        """Create the Listing and work out where each page starts.
+
+        Args:
+            widths: Iterable of the byte length of each item, in order.
+            render: Callable taking a start and stop index, and returning an
+                iterable of the strings of the items between them.
+            length: Maximum page length in bytes.
+            prefix: String to start the first page with.
+            sep: String placed between items.
+        """
+        self.render = render
+        self.prefix = prefix
+        self.sep = sep
+        widest = f" (page {PAGE_NUMBER_LIMIT}/{PAGE_NUMBER_LIMIT})"
+        self.budget = length - len(to_bytes(widest)) - 1
+        sep_length = len(to_bytes(sep))
+        self._starts, self._stop, size = [], 0, 0
+        for index, width in enumerate(widths):
+            budget = self._budget(len(self._starts))
+            if self._starts and size + sep_length + min(width, budget) <= budget:
+                size += sep_length + min(width, budget)
+            else:
+                self._starts.append(index)
+                size = min(width, self._budget(len(self._starts)))
+            self._stop = index + 1
+        self._pages = {}
+
+    def __getitem__(self, page=1):
+        """Return the given page, starting at 1.
+
+        Negative page numbers count back from the last page, and any other
+        invalid page number gives the first page.
+        """
+        try:
+            page = int(page)
+        except ValueError:
+            page = 1
+        if page < 0:
+            page += len(self) + 1
+        if not 0 < page <= len(self):
+            page = 1
+        if page not in self._pages:
+            self._pages[page] = self._page(page)
+        return self._pages[page]
+
+    def __len__(self):
+        """Return the number of pages."""
+        return len(self._starts)
+
+    def _budget(self, page):
+        """Return the bytes left for the items of the given page."""
+        return self.budget - len(to_bytes(self.prefix)) if page == 1 else self.budget
+
+    def _page(self, page):
+        """Format the page with the given number."""
+        if not self._starts:
+            return self.prefix.rstrip()
+        stop = self._starts[page] if page < len(self) else self._stop
+        budget = self._budget(page)
+        items = (
+            item if len(to_bytes(item)) <= budget else trim_bytes(item, budget)[0]
+            for item in self.render(self._starts[page - 1], stop)
+        )
+        suffix = f" (page {page}/{len(self)})" if len(self) > 1 else ""
+        return f"{self.prefix if page == 1 else ''}{self.sep.join(items)}{suffix}"
+
+
+def fit_bytes(data, limit, start=0):
+    """Return the last character boundary within a byte budget.
+
+    Steps back from the limit over any UTF-8 continuation bytes, then over
+    any characters that join onto the one before them, such as combining
+    accents or the parts of a joined emoji, so cutting the data at the
+    returned offset leaves whole characters either side. If that would step
+    back over more than MAX_JOINED characters, or all the way to start, the
+    cut falls back to the last whole code point within the limit instead.
+
+    Args:
+        data: UTF-8 encoded bytes.
+        limit: Greatest offset to return.
+        start: Least offset to return.
+
+    Returns:
+        Offset between start and limit to cut the data at, or the length of
+        the data if it is within the limit.
+    """
+    if limit >= len(data):
+        return len(data)
+    cut = max(limit, start)
+    while cut > start and data[cut] in _CONTINUATION:
+        cut -= 1
+    codepoint = cut
+    for _ in range(MAX_JOINED + 1):
+        if cut <= start:
+            break
+        before = cut - 1
+        while before > start and data[before] in _CONTINUATION:
+            before -= 1
+        end = cut + 1
+        while end < len(data) and data[end] in _CONTINUATION:
+            end += 1
+        if not _joined(data[before:cut].decode(ENCODING, "replace"), to_string(data[cut:end])):
+            return cut
+        cut = before
+    return codepoint
+
+
+def fit_chars(text, limit):
+    """Return the last character boundary within a character budget.
+
+    As fit_bytes, but counting characters of a string rather than bytes, so
+    the returned index never splits a combining accent or joined emoji from
+    the character it belongs to, unless it is part of a run of more than
+    MAX_JOINED joined characters or begins the text.
+
+    Args:
+        text: Input string.
+        limit: Greatest index to return.
+
+    Returns:
+        Index to cut the text at, or its length if it is within the limit.
+    """
+    if limit >= len(text):
+        return len(text)
+    cut = max(limit, 0)
+    for _ in range(MAX_JOINED + 1):
+        if not cut or not _joined(text[cut - 1], text[cut]):
+            return cut or max(limit, 0)
+        cut -= 1
+    return max(limit, 0)
+
+
+def page_of(items, page, length, prefix="", sep=", "):
+    """Return one page of a lazily produced sequence of strings.
+
+    Items are packed into pages in order, each page starting with the prefix
+    and staying under the given length in bytes, room being left for the
+    same "(page i/n)" suffix Paginate adds. Every item is measured to count
+    the pages, but only the requested page and the first are kept, so the
+    items are never joined into one long string.
+
+    Args:
+        items: Iterable of strings to list.
+        page: Page number to return, starts at 1. Negative page numbers count
+            back from the last page, as with Paginate, and any other invalid
+            page number gives the first page.
+        length: Maximum page length in bytes.
+        prefix: String to start each page with.
+        sep: String placed between items.
+
+    Returns:
+        String holding the page, or just the prefix if there are no items.
+    """
+    try:
+        page = int(page)
+    except ValueError:
+        page = 1
+    widest = f" (page {PAGE_NUMBER_LIMIT}/{PAGE_NUMBER_LIMIT})"
+    budget = length - len(to_bytes(prefix + widest)) - 1
+    last = deque(maxlen=max(-page, 0))
+    count, first, found = 0, None, None
+    for current in _packed(items, budget, len(to_bytes(sep))):
+        count += 1
+        if count == 1:
+            first = (count, current)
+        if count == page:
+            found = (count, current)
+        last.append((count, current))
+    if not count:
+        return prefix.rstrip()
+    if page < 0 and len(last) == -page:
+        found = last[0]
+    number, current = found or first
+    suffix = f" (page {number}/{count})" if count > 1 else ""
+    return f"{prefix}{sep.join(current)}{suffix}"
 
 
 def to_bytes(data):
@@ -150,16 +388,50 @@ def trim_bytes(msg="", length=0):
         length: Length to trim the input string to
 
     Returns:
-        Trimmed version of the input string
+        2-tuple of the trimmed string and its length in bytes, or the given
+        length if the string already fit
     """
     if msg:
-        try:
-            msg = to_string(to_bytes(msg)[:length])
-        except ValueError:
-            msg, length = trim_bytes(msg, length - 1)
+        data = to_bytes(msg)
+        if len(data) > length:
+            length = fit_bytes(data, length)
+            msg = to_string(data[:length])
     return msg, length
 
 
+def _joined(before, char):
+    """Return True if a character can't be split from the one before it."""
+    return before == _JOINER or char in _EXTENDERS or unicodedata.category(char) in _MARKS
+
+
+def _packed(items, budget, sep_length):
+    """Yield lists of the items, packed into pages within the byte budget.
+
+    Items longer than the budget are trimmed to fit a page of their own.
+    """
+    current, size = [], 0
+    for item in items:
+        text, text_length = item, len(to_bytes(item))
+        if text_length > budget:
+            text, text_length = trim_bytes(item, budget)
+        if current and size + sep_length + text_length > budget:
+            yield current
+            current, size = [], 0
+        size += text_length + (sep_length if current else 0)
+        current.append(text)
+    if current:
+        yield current
+
+
+def _find_all(data, sep):
+    """Return the offsets of every occurrence of sep in data, in order."""
+    res, pos = [], data.find(sep)
+    while pos != -1:
+        res.append(pos)
+        pos = data.find(sep, pos + 1)
+    return res
+
+
 def colourise(string, colour):
     """Take a string and surround it with ANSI colour formatting codes.
 
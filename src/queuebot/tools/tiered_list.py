@@ -0,0 +1,474 @@
+"""A TupleList split into priority tiers that stay in order as keys are added.
+
+Classes:
+    TieredList: Ordered, case-insensitive key: value pairs grouped into
+        tiers, with lower tiers always listed before higher ones.
+    PooledList: TupleList that keeps insertion order, but tracks its keys in
+        per-tier random pools so the lowest tier can be sampled directly.
+    RandomPool: Set of keys with constant time add, discard and random choice.
+"""
+
+import random
+from bisect import insort
+from time import time
+
+from .search_index import FuzzyIndex, PrefixTrie, TrigramIndex
+from .tuple_list import Entry, TupleList
+
+# Search indexes a PooledList builds the first time each one is used, with a
+# function returning the arguments the index's add method takes for an Entry
+SEARCH_INDEXES = {
+    "text": (TrigramIndex, lambda entry: (entry.folded, entry.value)),
+    "fuzzy": (FuzzyIndex, lambda entry: (entry.folded, entry.value)),
+    "key_prefix": (PrefixTrie, lambda entry: (entry.folded,)),
+    "key": (TrigramIndex, lambda entry: (entry.folded, entry.folded)),
+}
+
+
+class TieredList:
+    """Ordered key: value pairs grouped into priority tiers.
+
+    Each new key is placed into the tier chosen by the tier_of callable and
+    stays there until it is removed. Iteration and positions run through the
+    lowest tier first, so keys in higher tiers always come after those in
+    lower ones without the list ever being re-sorted.
+
+    Supports the same key / position interface as a TupleList. Casefolded
+    keys are also kept in a PrefixTrie, to find keys by their first letters.
+    The trie is only built once a prefix is first looked up, so loading a
+    long queue doesn't pay for it.
+    """
+
+    def __init__(self, tier_of, *tuples):
+        """Create the TieredList.
+
+        Args:
+            tier_of: Callable taking a key and returning the tier number it
+                should be placed in. Lower tiers are listed first.
+            tuples: Collection of 2-tuples representing key: value pairs, or
+                Entry records taken from another list.
+        """
+        self.tier_of = tier_of
+        self._tiers = {}
+        self._order = []
+        self._length = 0
+        self._key_trie = None
+        self.extend_many(tuples)
+
+    def __repr__(self):
+        """Return the tiers and their contents as a string."""
+        res = ", ".join(f"{tier}: {self._tiers[tier]!r}" for tier in self._order)
+        return f"TieredList({{{res}}})"
+
+    def __bool__(self):
+        """Return True if list contains data."""
+        return bool(self._length)
+
+    def __contains__(self, key):
+        """Return presence of key in list."""
+        return self._find(key) is not None
+
+    def __delitem__(self, key):
+        """Delete the given key and its value from the list."""
+        tier = self._find(key)
+        if tier is None:
+            raise ValueError(f"{key!r} is not in TieredList")
+        del self._tiers[tier][key]
+        self._removed(tier, key)
+
+    def __len__(self):
+        """Return length of list."""
+        return self._length
+
+    def __iter__(self):
+        """Yield tuples from the list, lowest tier first."""
+        for tier in self._order:
+            yield from self._tiers[tier]
+
+    def __getitem__(self, key):
+        """Return the value associated with the given key, or None."""
+        tier = self._find(key)
+        if tier is None:
+            return None
+        return self._tiers[tier][key]
+
+    def __setitem__(self, key, value):
+        """Set the value for the given key.
+
+        Existing keys keep their tier and position. New keys are appended to
+        the end of the tier chosen by tier_of.
+        """
+        tier = self._find(key)
+        if tier is None:
+            self._add(Entry(key, value))
+        else:
+            self._tiers[tier][key] = value
+
+    def extend_many(self, items):
+        """Add several tuples or Entry records in one pass.
+
+        Keys already present have their value updated in place. New keys are
+        grouped by tier, then each group is added to its tier as one batch.
+
+        Args:
+            items: Iterable of 2-tuples or Entry records.
+        """
+        groups, now = {}, time()
+        for item in items:
+            entry = item if isinstance(item, Entry) else Entry(*item, now)
+            tier = self._find(entry.key)
+            if tier is None:
+                groups.setdefault(self.tier_of(entry.key), {})[entry.folded] = entry
+            else:
+                self._tiers[tier][entry.key] = entry.value
+        for tier, group in groups.items():
+            if tier not in self._tiers:
+                self._tiers[tier] = TupleList()
+                insort(self._order, tier)
+            before = len(self._tiers[tier])
+            self._tiers[tier].extend_many(group.values())
+            self._length += len(self._tiers[tier]) - before
+            if self._key_trie is not None:
+                for key in group:
+                    self._key_trie.add(key)
+
+    def index(self, key):
+        """Return the index of the given key.
+
+        Raises:
+            ValueError: If the key is not in the list.
+        """
+        offset = 0
+        for tier in self._order:
+            if key in self._tiers[tier]:
+                return offset + self._tiers[tier].index(key)
+            offset += len(self._tiers[tier])
+        raise ValueError(f"{key!r} is not in TieredList")
+
+    def insert(self, index, item):
+        """Insert a tuple or Entry as near the given index as its tier allows.
+
+        The pair goes into the tier chosen by tier_of, at the given position
+        if that falls within the tier, otherwise at the nearest end of it.
+
+        Args:
+            index: Position the pair should have.
+            item: 2-tuple or Entry record.
+
+        Raises:
+            ValueError: If the key is already in the list.
+        """
+        entry = item if isinstance(item, Entry) else Entry(*item)
+        if entry.key in self:
+            raise ValueError(f"{entry.key!r} is already in TieredList")
+        tier = self.tier_of(entry.key)
+        if tier not in self._tiers:
+            self._tiers[tier] = TupleList()
+            insort(self._order, tier)
+        offset = sum(len(self._tiers[lower]) for lower in self._order if lower < tier)
+        self._tiers[tier].insert(index - offset, entry)
+        self._length += 1
+        if self._key_trie is not None:
+            self._key_trie.add(entry.folded)
+
+    def pop(self, index):
+        """Remove the given tuple index from self and return it."""
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("pop index out of range")
+        for tier in self._order:
+            if index < len(self._tiers[tier]):
+                item = self._tiers[tier].pop(index)
+                self._removed(tier, item[0])
+                return item
+            index -= len(self._tiers[tier])
+        raise IndexError("pop index out of range")
+
+    def choose(self, first=False):
+        """Return the position of a key: value pair from the lowest tier.
+
+        The lowest tier is listed first, so its pairs hold the positions from
+        0 up to its length.
+
+        Args:
+            first (bool): If true, don't choose randomly, but instead return
+                the position of the first pair.
+
+        Raises:
+            IndexError: If the list is empty.
+        """
+        if not self._order:
+            raise IndexError("Cannot choose from an empty sequence")
+        return 0 if first else random.randrange(len(self._tiers[self._order[0]]))
+
+    def with_prefix(self, prefix):
+        """Return the pairs whose key starts with the given prefix.
+
+        Matching is case-insensitive.
+
+        Returns:
+            List of (position, key, value) tuples, in list order.
+        """
+        offsets, offset = {}, 0
+        for tier in self._order:
+            offsets[tier] = offset
+            offset += len(self._tiers[tier])
+        if self._key_trie is None:
+            self._key_trie = PrefixTrie(entry.folded for entry in self.records())
+        res = []
+        for key in self._key_trie.with_prefix(prefix.casefold()):
+            tier = self._find(key)
+            res.append(
+                (
+                    offsets[tier] + self._tiers[tier].index(key),
+                    *self._tiers[tier].record(key).pair(),
+                )
+            )
+        return sorted(res)
+
+    def record(self, key):
+        """Return the Entry record held for the given key.
+
+        Raises:
+            ValueError: If the key is not in the list.
+        """
+        tier = self._find(key)
+        if tier is None:
+            raise ValueError(f"{key!r} is not in TieredList")
+        return self._tiers[tier].record(key)
+
+    def records(self):
+        """Yield the Entry records held in the list, lowest tier first."""
+        for tier in self._order:
+            yield from self._tiers[tier].records()
+
+    def serialise(self):
+        """Return the list of tuples stored in self."""
+        return list(self)
+
+    def _add(self, entry):
+        """Add an Entry to its tier, or update the value if already present."""
+        tier = self._find(entry.key)
+        if tier is not None:
+            self._tiers[tier][entry.key] = entry.value
+            return
+        tier = self.tier_of(entry.key)
+        if tier not in self._tiers:
+            self._tiers[tier] = TupleList()
+            insort(self._order, tier)
+        self._tiers[tier].append(entry)
+        self._length += 1
+        if self._key_trie is not None:
+            self._key_trie.add(entry.folded)
+
+    def _find(self, key):
+        """Return the tier holding the given key, or None."""
+        for tier in self._order:
+            if key in self._tiers[tier]:
+                return tier
+        return None
+
+    def _removed(self, tier, key):
+        """Account for a key removed from the given tier."""
+        self._length -= 1
+        if self._key_trie is not None:
+            self._key_trie.discard(key.casefold())
+        if not self._tiers[tier]:
+            del self._tiers[tier]
+            self._order.remove(tier)
+
+
+class PooledList(TupleList):
+    """A TupleList that can pick a random key from its lowest tier.
+
+    Pairs keep their insertion order, but each key is also tracked in a
+    RandomPool for the tier chosen by the tier_of callable when it was added.
+    Picking at random then samples the lowest non-empty pool directly rather
+    than filtering the whole list first.
+
+    Keys are unique; appending a key that is already present updates its
+    value in place.
+
+    Values are also kept in a TrigramIndex and a FuzzyIndex, so searching
+    them for a substring or a similar value only checks the pairs that could
+    match. Casefolded keys are kept in a PrefixTrie and a TrigramIndex of
+    their own, to find keys by their first letters or any part of them. Each
+    of these search indexes is built from every pair the first time it is
+    needed, then kept up to date, so loading a long queue only pays for
+    the pools.
+    """
+
+    unique = True
+
+    def __init__(self, tier_of, *tuples):
+        """Create the PooledList.
+
+        Args:
+            tier_of: Callable taking a key and returning the tier number it
+                belongs to. Lower tiers are preferred when picking.
+            tuples: Collection of 2-tuples representing key: value pairs.
+        """
+        self.tier_of = tier_of
+        self._pools = {}
+        self._order = []
+        self._key_tiers = {}
+        self._indexes = {}
+        super().__init__(*tuples)
+
+    def choose(self):
+        """Return the position of a random pair from the lowest tier.
+
+        Raises:
+            IndexError: If the list is empty.
+        """
+        if not self._order:
+            raise IndexError("Cannot choose from an empty sequence")
+        key = self._pools[self._order[0]].choice()
+        return self._rank.prefix(self._index[key])
+
+    def search(self, text):
+        """Return the pairs whose value contains the given text.
+
+        Matching is case-insensitive.
+
+        Returns:
+            List of (position, key, value) tuples, in queue order.
+        """
+        return self._located(self._search_index("text").search(text))
+
+    def search_keys(self, text):
+        """Return the pairs whose key contains the given text.
+
+        Matching is case-insensitive.
+
+        Returns:
+            List of (position, key, value) tuples, in queue order.
+        """
+        return self._located(self._search_index("key").search(text))
+
+    def with_prefix(self, prefix):
+        """Return the pairs whose key starts with the given prefix.
+
+        Matching is case-insensitive.
+
+        Returns:
+            List of (position, key, value) tuples, in queue order.
+        """
+        return self._located(self._search_index("key_prefix").with_prefix(prefix.casefold()))
+
+    def similar(self, text, threshold, partial=False):
+        """Return the pairs whose value is similar to the given text.
+
+        Args:
+            text: Text to compare values against.
+            threshold: Lowest similarity score to return, between 0 and 1.
+            partial: Whether to score values by how much of the text they
+                hold, rather than how alike the two are overall.
+
+        Returns:
+            List of (score, position, key, value) tuples, most similar first,
+            then in queue order.
+        """
+        scores = self._search_index("fuzzy").similar(text, threshold, partial)
+        res = [
+            (score, self._rank.prefix(self._index[key]), *self._slots[self._index[key]].pair())
+            for key, score in scores.items()
+        ]
+        return sorted(res, key=lambda match: (-match[0], match[1]))
+
+    def _search_index(self, name):
+        """Return the named search index, building it on first use."""
+        index = self._indexes.get(name)
+        if index is None:
+            index_type, args_of = SEARCH_INDEXES[name]
+            index = index_type()
+            for entry in self.records():
+                index.add(*args_of(entry))
+            self._indexes[name] = index
+        return index
+
+    def _located(self, keys):
+        """Return the (position, key, value) of the given keys, in order."""
+        slots = sorted(self._index[key] for key in keys)
+        return [(self._rank.prefix(slot), *self._slots[slot].pair()) for slot in slots]
+
+    def _on_add(self, entry):
+        """Add the new Entry to its pool and any search indexes built."""
+        for name, index in self._indexes.items():
+            index.add(*SEARCH_INDEXES[name][1](entry))
+        tier = self.tier_of(entry.key)
+        if tier not in self._pools:
+            self._pools[tier] = RandomPool()
+            insort(self._order, tier)
+        self._pools[tier].add(entry.folded)
+        self._key_tiers[entry.folded] = tier
+
+    def _on_remove(self, entry):
+        """Remove the Entry's key from its pool and built indexes."""
+        for index in self._indexes.values():
+            index.discard(entry.folded)
+        tier = self._key_tiers.pop(entry.folded)
+        self._pools[tier].discard(entry.folded)
+        if not self._pools[tier]:
+            del self._pools[tier]
+            self._order.remove(tier)
+
+    def _on_replace(self, _old, new):
+        """Reindex the text of an Entry whose value has changed."""
+        for name in ("text", "fuzzy"):
+            if name in self._indexes:
+                self._indexes[name].add(*SEARCH_INDEXES[name][1](new))
+
+
+class RandomPool:
+    """Set of keys with constant time add, discard and random choice.
+
+    Keys are held in a list alongside a map of their positions. Discarding
+    swaps the last key into the gap, so the list never needs shifting.
+    """
+
+    __slots__ = ("_keys", "_positions")
+
+    def __init__(self, *keys):
+        """Create the pool from the given keys."""
+        self._keys = []
+        self._positions = {}
+        for key in keys:
+            self.add(key)
+
+    def __bool__(self):
+        """Return True if the pool holds any keys."""
+        return bool(self._keys)
+
+    def __contains__(self, key):
+        """Return presence of key in the pool."""
+        return key in self._positions
+
+    def __len__(self):
+        """Return the number of keys in the pool."""
+        return len(self._keys)
+
+    def add(self, key):
+        """Add a key to the pool, ignoring keys already present."""
+        if key not in self._positions:
+            self._positions[key] = len(self._keys)
+            self._keys.append(key)
+
+    def discard(self, key):
+        """Remove a key from the pool if present."""
+        position = self._positions.pop(key, None)
+        if position is None:
+            return
+        last = self._keys.pop()
+        if position < len(self._keys):
+            self._keys[position] = last
+            self._positions[last] = position
+
+    def choice(self):
+        """Return a key from the pool, chosen uniformly at random.
+
+        Raises:
+            IndexError: If the pool is empty.
+        """
+        return random.choice(self._keys)
@@ -1,12 +1,16 @@
 """Manages a list erases its content after a specified time delay."""
 
-from time import time
+from time import monotonic, time
 
 
 class TimedList:
     """Implements a TimedList.
 
     Erases its content if no writes occur within the specified delay.
+
+    Each write sets a deadline on the monotonic clock, which public operations
+    check once before touching the data. Changes to the system clock don't
+    shorten or extend the list's life.
     """
 
     default_delay = 600
@@ -18,11 +22,13 @@ class TimedList:
             delay: Time delay after which the list is cleared. Writes within
                 this period keep extending the life of the list's data.
             kwargs: Collects attributes in a dict to apply to the newly created
-                list.
+                list, as produced by serialise. "time" is the wall clock
+                timestamp of the last write.
         """
-        self.data = kwargs.get("data", [])
         self.delay = kwargs.get("delay") or delay or TimedList.default_delay
-        self.time = kwargs.get("time", time())
+        self._data = kwargs.get("data", [])
+        self._written = kwargs.get("time", time())
+        self._deadline = monotonic() + self.delay - (time() - self._written)
 
     def __bool__(self):
         """Return True if list contains data."""
@@ -38,8 +44,7 @@ class TimedList:
         Yields:
             Elements taken from the list.
         """
-        for element in self.data:
-            yield element
+        yield from self.data
 
     def __contains__(self, value):
         """Return True if the given value appears in the list."""
@@ -49,40 +54,18 @@ class TimedList:
         """Return the list element at the specified index."""
         return self.data[index]
 
-    def __getattribute__(self, attr):
-        """Intercept attribute lookups in order to clear an expired list.
-
-        If the list's data is outdated, clear it before returning the requested
-        attribute.
-
-        Args:
-            attr (str): Name of the requested attribute.
-
-        Returns:
-            Content of the requested attribute.
-        """
-        delay = object.__getattribute__(self, "delay")
-        if (
-            attr == "data"
-            and (now := time()) - object.__getattribute__(self, "time") > delay
-        ):
-            object.__setattr__(self, "time", now)
-            object.__setattr__(self, "data", [])
-        return object.__getattribute__(self, attr)
-
-    def __setattr__(self, attr, value):
-        """Intercept attribute writes in order to record the current timestamp.
-
-        This timestamp is checked on later lookups to decide if the list needs
-        clearing.
+    @property
+    def data(self):
+        """Return the list's data, clearing it first if it has expired."""
+        if self._data and monotonic() >= self._deadline:
+            self._data = []
+        return self._data
 
-        Args:
-            attr (str): Name of the attribute to write.
-            value: Value to write to the given attribute.
-        """
-        if attr == "data":
-            object.__setattr__(self, "time", time())
-        object.__setattr__(self, attr, value)
+    @data.setter
+    def data(self, value):
+        """Replace the list's data, restarting the expiry delay."""
+        self._data = value
+        self._touch()
 
     def append(self, value):
         """Add a value to the end of the list.
@@ -90,8 +73,8 @@ class TimedList:
         Args:
             value: Value to add to the list.
         """
-        self.time = time()
-        self.data += [value]
+        self.data.append(value)
+        self._touch()
 
     def get(self):
         """Return the stored list."""
@@ -103,4 +86,9 @@ class TimedList:
         Returns:
             dict: Attributes and their values
         """
-        return self.__dict__
+        return {"data": list(self.data), "delay": self.delay, "time": self._written}
+
+    def _touch(self):
+        """Record a write, pushing the expiry deadline back."""
+        self._written = time()
+        self._deadline = monotonic() + self.delay
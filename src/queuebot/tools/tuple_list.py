@@ -1,56 +1,83 @@
 """A dict-like object that maintains ordering of key: value pairs."""
 
-import random
+import sys
+from time import time
+
+# Dead slots tolerated before a TupleList compacts its storage
+COMPACT_THRESHOLD = 64
 
 
 class TupleList:
     """A dict - like object that also maintains ordering of key: value pairs.
 
-    Addressing by key is case-insensitive
+    Addressing by key is case-insensitive. An internal index maps each
+    casefolded key to the slot of its first occurrence, so membership tests
+    and lookups don't need to scan the list.
+
+    Pairs are stored as Entry records, which carry their casefolded key so it
+    only needs computing once per pair.
+
+    Entries live in append-only slots; removing one only empties its slot. A
+    rank index over the slots turns positions into slots and back in
+    O(log n), so positional pops and "what position is this key" queries
+    don't shift or scan the list. Empty slots are compacted away once they
+    outnumber the live ones.
+
+    Batch operations (extend_many, remove_many, merge) touch each pair once and
+    rebuild the indexes in a single pass, so building or combining large
+    lists stays linear.
 
     Implements simple mathematical operators as set - like interactions
     """
 
+    # When True, adding a key that is already present updates it in place
+    unique = False
+
     def __init__(self, *tuples):
         """Create the TupleList.
 
         Args:
-            tuples: Collection of 2-tuples representing key: value pairs.
+            tuples: Collection of 2-tuples representing key: value pairs, or
+                Entry records taken from another TupleList.
         """
-        self.data = []
-        for key, value in tuples:
-            self.data.append((key, value))
+        self._slots = []
+        self._rank = _RankIndex()
+        self._index = {}
+        self._length = 0
+        self._duplicates = 0
+        self.extend_many(tuples)
 
     def __str__(self):
         """Return contents of list as a string."""
-        res = "\n".join(f'{key}: "{value}"' for key, value in self.data)
+        res = "\n".join(f'{key}: "{value}"' for key, value in self)
         return f"TupleList contents:\n{res}"
 
     def __repr__(self):
         """Return contents of list as an eval compatible string."""
-        res = ", ".join(f'("{key}", "{value}")' for key, value in self.data)
+        res = ", ".join(f'("{key}", "{value}")' for key, value in self)
         return f"TupleList({res})"
 
     def __bool__(self):
         """Return True if list contains data."""
-        return bool(self.data)
+        return bool(self._length)
 
     def __contains__(self, key):
         """Return presence of key in list."""
-        return key.casefold() in [k.casefold() for (k, v) in self.data]
+        return key.casefold() in self._index
 
     def __delitem__(self, key):
         """Delete the given key and its value from the list."""
-        del self.data[self.index(key)]
+        self._remove(self._slot(key))
 
     def __len__(self):
         """Return length of list."""
-        return len(self.data)
+        return self._length
 
     def __iter__(self):
         """Yield tuples from the list."""
-        for i in self.data:
-            yield i
+        for entry in self._slots:
+            if entry is not None:
+                yield entry.key, entry.value
 
     def __getitem__(self, key):
         """Return the value associated with the given key.
@@ -63,19 +90,18 @@ class TupleList:
         Returns:
             Value associated with the key if it exists, otherwise None.
         """
-        if key.casefold() in self:
-            return {k.casefold(): v for k, v in self.data}[key.casefold()]
-        return None
+        slot = self._index.get(key.casefold())
+        if slot is None:
+            return None
+        return self._slots[slot].value
 
     def __setitem__(self, key, value):
         """Set the value for the given key."""
-        if key not in self:
-            self.data.append((key, value))
+        slot = self._index.get(key.casefold())
+        if slot is None:
+            self.append((key, value))
         else:
-            for i, (k, _) in enumerate(self.data):
-                if k.casefold() == key.casefold():
-                    self.data[i] = (key, value)
-                    break
+            self._replace(slot, key, value)
 
     def __add__(self, other):
         """Return result of adding two TupleLists.
@@ -90,8 +116,7 @@ class TupleList:
             Result of the addition, as a new TupleList.
         """
         res = self.copy()
-        for key, value in other:
-            res[key] = value
+        res.merge(other)
         return res
 
     def __sub__(self, other):
@@ -106,80 +131,346 @@ class TupleList:
         Returns:
             Result of the subtraction, as a new TupleList.
         """
-        res = TupleList()
-        for key, value in self:
-            if key not in other:
-                res.append((key, value))
-        return res
+        return TupleList(*(entry for entry in self.records() if entry.key not in other))
 
     def __iadd__(self, other):
-        """Return result of an in-place addition."""
-        return self + other
+        """Merge another TupleList into self."""
+        self.merge(other)
+        return self
 
     def __isub__(self, other):
-        """Return result of an in-place subtraction."""
-        return self - other
+        """Remove the keys present in another TupleList from self."""
+        self.remove_many(key for key, _value in other)
+        return self
 
     def __eq__(self, other):
         """Return equality between two TupleLists."""
         return repr(self) == repr(other)
 
     def append(self, item):
-        """Append a tuple to the end of the TupleList."""
-        return self.data.append(item)
+        """Append a tuple or Entry to the end of the TupleList."""
+        if self._add(_as_entry(item)):
+            self._rank.append()
 
-    def copy(self):
-        """Return a new TupleList containing the same data as self."""
-        return TupleList(*self.data)
+    def extend_many(self, items):
+        """Append several tuples or Entry records in one pass.
 
-    def deprioritise(self, other=None):
-        """Move the keys found in the other TupleList to the end of self."""
-        if other is None:
-            other = TupleList()
-        front = self - other
-        back = self - front
-        return front + back
+        Small batches are appended one at a time. Larger ones are added to the
+        slots directly, then the rank index is rebuilt once.
 
-    def index(self, key):
-        """Return the index of the given key."""
-        return [k.casefold() for (k, v) in self.data].index(key.casefold())
+        Args:
+            items: Iterable of 2-tuples or Entry records.
+        """
+        now = time()
+        entries = [_as_entry(item, now) for item in items]
+        if len(entries) * len(self._slots).bit_length() < len(self._slots):
+            for entry in entries:
+                self.append(entry)
+            return
+        for entry in entries:
+            self._add(entry)
+        self._rank = _RankIndex(entry is not None for entry in self._slots)
+
+    def insert(self, index, item):
+        """Insert a tuple or Entry so that it ends up at the given index.
+
+        The pair reuses an empty slot between its neighbours if there is one,
+        as there is when putting back a pair that was just removed. Otherwise
+        the slots after it are shifted along and the indexes rebuilt.
+
+        Args:
+            index: Position the pair should have, clamped to the list.
+            item: 2-tuple or Entry record.
 
-    def random(self, other="", first=False):
-        """Return a key: value pair at random.
+        Raises:
+            ValueError: If the list only holds unique keys and already holds
+                the item's key.
+        """
+        entry = _as_entry(item)
+        slot = self._index.get(entry.folded)
+        if slot is not None and self.unique:
+            raise ValueError(f"{entry.key!r} is already in TupleList")
+        index = min(max(index, 0), self._length)
+        low = self._rank.select(index - 1) + 1 if index else 0
+        high = self._rank.select(index) if index < self._length else len(self._slots)
+        if low < high:
+            self._slots[high - 1] = entry
+            self._rank.add(high - 1, 1)
+            if slot is None or high - 1 < slot:
+                self._index[entry.folded] = high - 1
+            self._duplicates += slot is not None
+        else:
+            self._slots.insert(low, entry)
+            self._compact()
+        self._length += 1
+        self._on_add(entry)
 
-        If another TupleList is provided, prefer to pick keys unique to the
-        first TupleList if possible, otherwise pick a random key: value pair.
+    def remove_many(self, keys):
+        """Remove every pair whose key is in the given keys, in one pass.
 
         Args:
-            other (TupleList): Keys in this list are considered last when
-                picking.
-            first (bool): If true, don't pick randomly, but instead return the
-                first key: value unique to the first list.
+            keys: Iterable of keys to remove. Keys not in the list are ignored.
 
         Returns:
-            2-tuple ((key, value), repeat_pick), where the first element is the
-            key: value pair picked. The second element is True when the picked
-            key was present in the supplied "other" TupleList argument.
+            List of the removed key: value tuples, in their original order.
         """
-        # TODO: Refactor this mess
-        if not other:
-            other = TupleList()
-        pool = self - other
-        if pool:
-            repeat_pick = False
-        else:
-            repeat_pick = True
-            pool = self
-        if first:
-            key, _ = pool.data[0]
-        else:
-            key, _ = random.choice(pool.data)
-        return self.pop(self.index(key)), repeat_pick
+        folded = {key.casefold() for key in keys}
+        removed = []
+        for slot, entry in enumerate(self._slots):
+            if entry is not None and entry.folded in folded:
+                self._slots[slot] = None
+                removed.append(entry)
+        if removed:
+            self._length -= len(removed)
+            self._compact()
+            for entry in removed:
+                self._on_remove(entry)
+        return [entry.pair() for entry in removed]
+
+    def merge(self, other):
+        """Add the pairs from another TupleList to self, in one pass.
+
+        Keys already present take the other list's value and keep their
+        position. New keys are appended in the order they appear in other.
+
+        Args:
+            other: TupleList, or iterable of 2-tuples, to merge into self.
+        """
+        items = other.records() if hasattr(other, "records") else other
+        new = {}
+        for entry in map(_as_entry, items):
+            slot = self._index.get(entry.folded)
+            if slot is not None:
+                self._replace(slot, entry.key, entry.value)
+            elif entry.folded in new:
+                new[entry.folded] = new[entry.folded].replace(entry.key, entry.value)
+            else:
+                new[entry.folded] = entry
+        self.extend_many(new.values())
+
+    def copy(self):
+        """Return a new TupleList containing the same data as self."""
+        return TupleList(*self.records())
+
+    def index(self, key):
+        """Return the index of the given key.
+
+        Raises:
+            ValueError: If the key is not in the list.
+        """
+        return self._rank.prefix(self._slot(key))
 
     def pop(self, index):
         """Remove the given tuple index from self and return it."""
-        return self.data.pop(index)
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("pop index out of range")
+        return self._remove(self._rank.select(index)).pair()
+
+    def record(self, key):
+        """Return the Entry record held for the given key.
+
+        Raises:
+            ValueError: If the key is not in the list.
+        """
+        return self._slots[self._slot(key)]
+
+    def records(self):
+        """Yield the Entry records held in the list, in order."""
+        for entry in self._slots:
+            if entry is not None:
+                yield entry
 
     def serialise(self):
         """Return the list of tuples stored in self."""
-        return self.data.copy()
+        return list(self)
+
+    def _slot(self, key):
+        """Return the slot holding the given key.
+
+        Raises:
+            ValueError: If the key is not in the list.
+        """
+        try:
+            return self._index[key.casefold()]
+        except KeyError:
+            raise ValueError(f"{key!r} is not in TupleList") from None
+
+    def _add(self, entry):
+        """Place an Entry in a new slot, without touching the rank index.
+
+        Returns:
+            True if a new slot was used, False if an existing key was updated
+            in place because the list only holds unique keys.
+        """
+        slot = self._index.get(entry.folded)
+        if slot is not None and self.unique:
+            self._replace(slot, entry.key, entry.value)
+            return False
+        if slot is None:
+            self._index[entry.folded] = len(self._slots)
+        else:
+            self._duplicates += 1
+        self._slots.append(entry)
+        self._length += 1
+        self._on_add(entry)
+        return True
+
+    def _replace(self, slot, key, value):
+        """Update the pair held in the given slot, keeping its position."""
+        old = self._slots[slot]
+        self._slots[slot] = old.replace(key, value)
+        self._on_replace(old, self._slots[slot])
+
+    def _on_add(self, entry):
+        """Hook called after a new Entry is added to the list."""
+
+    def _on_remove(self, entry):
+        """Hook called after an Entry is removed from the list."""
+
+    def _on_replace(self, old, new):
+        """Hook called after an Entry is replaced by one with a new value."""
+
+    def _remove(self, slot):
+        """Empty the given slot and return the Entry it held."""
+        entry = self._slots[slot]
+        self._slots[slot] = None
+        self._rank.add(slot, -1)
+        self._length -= 1
+
+        key = entry.folded
+        if self._index.get(key) != slot:
+            self._duplicates -= 1
+        else:
+            del self._index[key]
+            if self._duplicates:
+                self._promote_duplicate(key, slot)
+
+        if len(self._slots) - self._length > max(self._length, COMPACT_THRESHOLD):
+            self._compact()
+        self._on_remove(entry)
+        return entry
+
+    def _promote_duplicate(self, key, start):
+        """Index the next occurrence of key after the given slot, if any."""
+        for slot in range(start + 1, len(self._slots)):
+            entry = self._slots[slot]
+            if entry is not None and entry.folded == key:
+                self._index[key] = slot
+                self._duplicates -= 1
+                return
+
+    def _compact(self):
+        """Drop empty slots, rebuilding the rank index and key index."""
+        self._slots = list(self.records())
+        self._rank = _RankIndex([1] * len(self._slots))
+        self._index = {}
+        for slot, entry in enumerate(self._slots):
+            self._index.setdefault(entry.folded, slot)
+        self._duplicates = len(self._slots) - len(self._index)
+
+
+class Entry:
+    """A single key: value pair held by a TupleList.
+
+    Attributes:
+        key: Key as it was given, e.g. a username for display.
+        folded: Casefolded key, interned so every record for the same key
+            shares one string.
+        value: Value associated with the key.
+        added: Timestamp of when the pair was first added.
+    """
+
+    __slots__ = ("added", "folded", "key", "value")
+
+    def __init__(self, key, value, added=None):
+        """Create the Entry.
+
+        Args:
+            key: Key of the pair.
+            value: Value of the pair.
+            added: Timestamp the pair was added at, defaults to now.
+        """
+        self.key = key
+        self.folded = sys.intern(key.casefold())
+        self.value = value
+        self.added = time() if added is None else added
+
+    def __repr__(self):
+        """Return the record as an eval compatible string."""
+        return f"Entry({self.key!r}, {self.value!r}, {self.added!r})"
+
+    def pair(self):
+        """Return the record as a key: value tuple."""
+        return self.key, self.value
+
+    def replace(self, key, value):
+        """Return a new record for the same pair, keeping its added time."""
+        return Entry(key, value, self.added)
+
+
+def _as_entry(item, added=None):
+    """Return the given tuple or Entry as an Entry.
+
+    Args:
+        item: 2-tuple or Entry record.
+        added: Timestamp given to a new Entry, defaults to now.
+    """
+    return item if isinstance(item, Entry) else Entry(*item, added)
+
+
+class _RankIndex:
+    """Fenwick tree counting the live slots of a TupleList.
+
+    Answers "how many live slots come before this one" (rank) and "which slot
+    holds the nth live item" (select) in O(log n).
+    """
+
+    __slots__ = ("tree",)
+
+    def __init__(self, flags=()):
+        """Create the index in linear time.
+
+        Args:
+            flags: Iterable with a truthy value for each live slot and a falsy
+                one for each empty slot.
+        """
+        tree = [0, *map(int, flags)]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self.tree = tree
+
+    def append(self):
+        """Add a new live slot to the end of the index."""
+        i = len(self.tree)
+        self.tree.append(1 + self.prefix(i - 1) - self.prefix(i - (i & -i)))
+
+    def add(self, slot, delta):
+        """Adjust the count held at the given slot."""
+        i = slot + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, slot):
+        """Return the number of live slots before the given slot."""
+        total = 0
+        while slot > 0:
+            total += self.tree[slot]
+            slot -= slot & -slot
+        return total
+
+    def select(self, rank):
+        """Return the slot holding the live item at the given rank."""
+        slot, remaining = 0, rank + 1
+        step = 1 << (len(self.tree) - 1).bit_length()
+        while step:
+            nxt = slot + step
+            if nxt < len(self.tree) and self.tree[nxt] < remaining:
+                slot = nxt
+                remaining -= self.tree[nxt]
+            step >>= 1
+        return slot
@@ -0,0 +1,73 @@
+"""Bounded undo / redo history of reversible steps.
+
+Classes:
+    UndoHistory: Keeps a limited number of steps to step backwards and
+        forwards through.
+"""
+
+from collections import deque
+
+
+class UndoHistory:
+    """Bounded rings of steps for undoing and redoing changes.
+
+    Steps are opaque to the history, it only decides which one to hand to the
+    callable that reverts it, and keeps whatever that returns to reverse the
+    revert. Once a ring is full, its oldest step is dropped.
+    """
+
+    def __init__(self, limit=10):
+        """Create the history.
+
+        Args:
+            limit: Maximum number of steps kept in each direction.
+        """
+        self.limit = limit
+        self._undo = deque(maxlen=limit)
+        self._redo = deque(maxlen=limit)
+
+    def __len__(self):
+        """Return the number of changes that can be undone."""
+        return len(self._undo)
+
+    def record(self, step):
+        """Record the step that reverts a new change.
+
+        Any undone changes can no longer be redone afterwards.
+
+        Args:
+            step: Step to revert if the change is undone.
+        """
+        self._undo.append(step)
+        self._redo.clear()
+
+    def undo(self, revert):
+        """Revert the last change.
+
+        Args:
+            revert: Callable taking a step, reverting it and returning the
+                step that reverts it in turn, kept so the undo can be redone.
+
+        Raises:
+            IndexError: If there is nothing to undo.
+        """
+        self._redo.append(revert(self._undo[-1]))
+        self._undo.pop()
+
+    def redo(self, revert):
+        """Reapply the last change that was undone.
+
+        Args:
+            revert: Callable as for undo, returning the step kept so the redo
+                can be undone.
+
+        Raises:
+            IndexError: If there is nothing to redo.
+        """
+        self._undo.append(revert(self._redo[-1]))
+        self._redo.pop()
+
+    def clear(self):
+        """Forget all steps."""
+        self._undo.clear()
+        self._redo.clear()